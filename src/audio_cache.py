@@ -0,0 +1,245 @@
+"""
+本機音訊快取：常播的歌存成可直接送出的 Ogg/Opus 檔（以影片 ID 命名），
+之後播放不必再經過 yt-dlp、網路或 FFmpeg。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shlex
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+import discord
+from discord.oggparse import OggStream
+
+from .extractor import ExtractedTrack
+from .music import FFMPEG_BEFORE_OPTIONS, can_passthrough
+
+
+class OggFileAudio(discord.AudioSource):
+    """直接從 Ogg 檔逐一讀出 Opus 封包交給語音連線。"""
+
+    def __init__(self, path: str, on_cleanup: Callable[[], None] | None = None):
+        self._file = open(path, "rb")
+        self._packets = OggStream(self._file).iter_packets()
+        self._on_cleanup = on_cleanup
+
+    def read(self) -> bytes:
+        for packet in self._packets:
+            if not packet.startswith((b"OpusHead", b"OpusTags")):  # 標頭不是音訊
+                return packet
+        return b""
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self):
+        # 播放器執行緒與 GuildPlayer 都可能呼叫
+        if self._file.closed:
+            return
+        self._file.close()
+        if self._on_cleanup is not None:
+            self._on_cleanup()
+
+
+class AudioCache:
+    """
+    - 第一次播放時在背景用 FFmpeg 另外抓一份存檔（已是 Opus 就只 remux）
+    - 總容量超過 max_bytes 時刪掉最久沒播的；LRU 順序記在檔案的 mtime，重啟後沿用
+    - 正在播放的檔案不刪（Windows 上開著的檔案刪不掉），超出的容量留到下次再清
+    - 每首歌旁邊有一個 .json 記標題與長度，命中時連 yt-dlp 都不用跑
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_duration: float = 1200, concurrency: int = 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_duration = max_duration
+        self._entries: OrderedDict[str, int] = OrderedDict()  # video_id -> bytes，最舊的在前
+        self._bytes = 0
+        self._filling: dict[str, asyncio.Task] = {}
+        self._in_use: dict[str, int] = {}  # video_id -> 開著的 OggFileAudio 數；釋放在播放器執行緒上
+        self._in_use_lock = threading.Lock()
+        self._limit = asyncio.Semaphore(concurrency)
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.failures = 0
+
+    def start(self):
+        """掃描既有的快取檔，依 mtime 還原 LRU 順序；沒寫完的暫存檔直接刪掉。"""
+        os.makedirs(self.directory, exist_ok=True)
+        # 可能被呼叫第二次（重新載入失敗、退回舊模組時），從頭掃描
+        self._entries.clear()
+        self._bytes = 0
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+            elif name.endswith(".ogg") and os.path.exists(path[:-4] + ".json"):
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, video_id, size in sorted(found):
+            self._entries[video_id] = size
+            self._bytes += size
+        self._evict()
+
+    async def close(self):
+        for task in list(self._filling.values()):
+            task.cancel()
+        await asyncio.gather(*self._filling.values(), return_exceptions=True)
+
+    def _path(self, video_id: str, suffix: str = ".ogg") -> str:
+        return os.path.join(self.directory, video_id + suffix)
+
+    def get(self, video_id: str) -> ExtractedTrack | None:
+        """快取中的歌曲資訊（stream_url 為本機檔案路徑）；不計入命中率。"""
+        if video_id not in self._entries:
+            return None
+        try:
+            with open(self._path(video_id, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            self._remove(video_id)
+            return None
+        return ExtractedTrack(
+            stream_url=self._path(video_id),
+            title=meta.get("title", "音樂"),
+            video_id=video_id,
+            webpage_url=meta.get("webpage_url"),
+            acodec="opus",
+            asr=48000,
+            duration=meta.get("duration"),
+        )
+
+    def open(self, track: ExtractedTrack) -> discord.AudioSource | None:
+        """命中時回傳本機音源；沒命中則排進背景下載並回傳 None。"""
+        video_id = track.video_id
+        if not video_id:
+            return None
+        if video_id in self._entries:
+            try:
+                source = OggFileAudio(self._path(video_id), on_cleanup=lambda: self._release(video_id))
+            except OSError:
+                self._remove(video_id)
+            else:
+                with self._in_use_lock:
+                    self._in_use[video_id] = self._in_use.get(video_id, 0) + 1
+                self.hits += 1
+                self._entries.move_to_end(video_id)
+                os.utime(self._path(video_id))
+                return source
+        self.misses += 1
+        self.schedule_fill(track)
+        return None
+
+    def schedule_fill(self, track: ExtractedTrack):
+        video_id = track.video_id
+        if (
+            not video_id
+            or video_id in self._entries
+            or video_id in self._filling
+            or os.path.exists(track.stream_url)
+            or (track.duration or 0) > self.max_duration
+            or not track.duration  # 直播沒有長度，不快取
+        ):
+            return
+        task = asyncio.create_task(self._fill(track))
+        self._filling[video_id] = task
+        task.add_done_callback(lambda _: self._filling.pop(video_id, None))
+
+    async def _fill(self, track: ExtractedTrack):
+        video_id = track.video_id
+        tmp = self._path(video_id, ".tmp")
+        if can_passthrough(track):
+            codec = ["-c:a", "copy"]
+        else:
+            codec = ["-c:a", "libopus", "-b:a", "128k", "-ar", "48000", "-ac", "2"]
+        args = [
+            *shlex.split(FFMPEG_BEFORE_OPTIONS),
+            "-i", track.stream_url,
+            "-vn", "-map_metadata", "-1", *codec,
+            "-loglevel", "error", "-f", "opus", "-y", tmp,
+        ]
+        async with self._limit:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    "ffmpeg", *args, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.DEVNULL
+                )
+            except OSError as exc:
+                self.failures += 1
+                print(f"音訊快取無法啟動 FFmpeg: {exc}")
+                return
+            try:
+                returncode = await asyncio.wait_for(process.wait(), timeout=max(120.0, track.duration))
+            except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                if isinstance(exc, asyncio.CancelledError):
+                    raise
+                returncode = None
+        if returncode != 0 or not os.path.exists(tmp):
+            self.failures += 1
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            reason = "逾時" if returncode is None else f"FFmpeg 結束碼 {returncode}"
+            print(f"音訊快取下載失敗 ({track.title}): {reason}")
+            return
+        size = os.path.getsize(tmp)
+        if size > self.max_bytes:
+            os.remove(tmp)
+            return
+        with open(self._path(video_id, ".json"), "w", encoding="utf-8") as f:
+            json.dump({"title": track.title, "webpage_url": track.webpage_url, "duration": track.duration}, f, ensure_ascii=False)
+        os.replace(tmp, self._path(video_id))
+        self._entries[video_id] = size
+        self._bytes += size
+        self.fills += 1
+        self._evict()
+
+    def _release(self, video_id: str):
+        with self._in_use_lock:
+            count = self._in_use.pop(video_id, 0) - 1
+            if count > 0:
+                self._in_use[video_id] = count
+
+    def _evict(self):
+        for video_id in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            if video_id not in self._in_use:
+                self._remove(video_id)
+
+    def _remove(self, video_id: str):
+        # 先刪音檔：刪不掉（被其他程式開著）就保留項目，下次淘汰時再試
+        try:
+            os.remove(self._path(video_id))
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            print(f"音訊快取無法刪除 {video_id}: {exc}")
+            return
+        self._bytes -= self._entries.pop(video_id, 0)
+        try:
+            os.remove(self._path(video_id, ".json"))
+        except OSError:
+            pass
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "fills": self.fills,
+            "failures": self.failures,
+            "filling": len(self._filling),
+        }
@@ -0,0 +1,162 @@
+"""
+叢集模式：多個 worker 行程分攤分片（shard），每個 worker 各自是一個 AutoShardedBot。
+
+    python -m src.cluster --workers 4
+
+- 伺服器相關的狀態依分片切分：每個 worker 只載入自己分片上伺服器的資料
+- 每個 YouTube 頻道只由一個 worker 輪詢（依頻道 ID 雜湊分配），結果經由資料庫裡的事件表交給各 worker
+- 語音與播歌依伺服器所在的分片自然分開
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import time
+import zlib
+
+from .config import CLUSTER_COUNT, CLUSTER_ID, DISCORD_TOKEN, SHARD_COUNT, SHARD_IDS
+
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+IDENTIFY_WINDOW = 5.0  # Discord 每 5 秒可以 identify max_concurrency 個分片
+
+CLUSTERED = CLUSTER_COUNT > 1
+_OWNED_SHARDS = frozenset(SHARD_IDS or ())
+
+
+def shard_of(guild_id: int, shard_count: int) -> int:
+    # Discord 的分片公式；私訊（guild_id 0）一律在分片 0
+    return (guild_id >> 22) % shard_count
+
+
+def owns_guild(guild_id: int) -> bool:
+    """這個 worker 負責的分片上是否有這個伺服器；沒有分片設定時一律是。"""
+    if not SHARD_COUNT or SHARD_IDS is None:
+        return True
+    return shard_of(guild_id, SHARD_COUNT) in _OWNED_SHARDS
+
+
+def feed_owner(channel_id: str) -> int:
+    """負責輪詢這個 YouTube 頻道的 worker（CLUSTER_ID）。"""
+    return zlib.crc32(channel_id.encode()) % CLUSTER_COUNT
+
+
+def owns_feed(channel_id: str) -> bool:
+    return feed_owner(channel_id) == CLUSTER_ID
+
+
+def split_shards(shard_count: int, workers: int) -> list[list[int]]:
+    """把分片切成 workers 段連續範圍（同一段的分片在同一個行程，identify 時依序排隊）。"""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for index in range(workers):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+# ----------------------------
+# 啟動器
+# ----------------------------
+
+
+async def fetch_gateway_info(token: str) -> tuple[int, int]:
+    """Discord 建議的分片數與 max_concurrency。"""
+    import aiohttp
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers={"Authorization": f"Bot {token}"}) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    return int(data["shards"]), int(data["session_start_limit"]["max_concurrency"])
+
+
+async def _stop_process(proc: asyncio.subprocess.Process, timeout: float = 30):
+    if proc.returncode is not None:
+        return
+    # SIGINT 讓 worker 走正常關閉流程（卸載擴充、寫回狀態）
+    if os.name == "nt":
+        proc.terminate()
+    else:
+        proc.send_signal(signal.SIGINT)
+    try:
+        await asyncio.wait_for(proc.wait(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+
+
+async def run_worker(cluster_id: int, cluster_count: int, shard_ids: list[int], shard_count: int, delay: float):
+    """啟動一個 worker，異常結束時以指數退避重啟。"""
+    await asyncio.sleep(delay)
+    env = dict(
+        os.environ,
+        SHARD_COUNT=str(shard_count),
+        SHARD_IDS=",".join(map(str, shard_ids)),
+        CLUSTER_ID=str(cluster_id),
+        CLUSTER_COUNT=str(cluster_count),
+    )
+    backoff = 5.0
+    while True:
+        started = time.monotonic()
+        # 獨立的行程群組：終端機的 Ctrl+C 只送到啟動器，由啟動器依序關閉各 worker
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", f"{__package__}.bot", env=env, start_new_session=os.name != "nt"
+        )
+        print(f"worker {cluster_id} 啟動（pid={proc.pid}，分片 {shard_ids[0]}-{shard_ids[-1]}）")
+        try:
+            code = await proc.wait()
+        except asyncio.CancelledError:
+            await _stop_process(proc)
+            raise
+        if time.monotonic() - started > 300:
+            backoff = 5.0
+        print(f"worker {cluster_id} 結束（代碼 {code}），{backoff:.0f} 秒後重啟")
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, 300)
+
+
+async def run_cluster(workers: int, shard_count: int | None):
+    if not DISCORD_TOKEN:
+        raise RuntimeError("缺少 DISCORD_TOKEN 環境變數")
+    recommended, max_concurrency = await fetch_gateway_info(DISCORD_TOKEN)
+    shard_count = shard_count or recommended
+    ranges = split_shards(shard_count, workers)
+    print(f"共 {shard_count} 個分片（建議 {recommended}），{len(ranges)} 個 worker，max_concurrency={max_concurrency}")
+
+    if os.name != "nt":
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+    # 各 worker 錯開啟動：前一個 worker 的分片 identify 完之後才輪到下一個
+    tasks = []
+    delay = 0.0
+    for cluster_id, shard_ids in enumerate(ranges):
+        tasks.append(asyncio.create_task(run_worker(cluster_id, len(ranges), shard_ids, shard_count, delay)))
+        delay += -(-len(shard_ids) // max_concurrency) * IDENTIFY_WINDOW
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="以多個行程執行 Bot（每個行程負責一段分片）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker 行程數，預設為 CPU 核心數")
+    parser.add_argument("--shards", type=int, default=None, help="總分片數，預設採用 Discord 建議值")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run_cluster(args.workers, args.shards))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
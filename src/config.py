@@ -0,0 +1,64 @@
+"""
+環境變數設定，Bot 本體與各功能擴充共用。
+"""
+
+from __future__ import annotations
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DISCORD_TOKEN = (os.getenv("DISCORD_TOKEN") or "").strip()
+TENOR_KEY = (os.getenv("TENOR_KEY") or "").strip() or None
+TENOR_CACHE_TTL = float(os.getenv("TENOR_CACHE_TTL") or 3600)
+TENOR_NEGATIVE_TTL = float(os.getenv("TENOR_NEGATIVE_TTL") or 60)
+HTTP_LIMIT_PER_HOST = int(os.getenv("HTTP_LIMIT_PER_HOST") or 16)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT") or 5)
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT") or 10)
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES") or 2)
+HTTP_BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD") or 5)
+HTTP_BREAKER_RESET = float(os.getenv("HTTP_BREAKER_RESET") or 30)
+CAT_POOL_SIZE = int(os.getenv("CAT_POOL_SIZE") or 8)
+CAT_POOL_REFILL_SECONDS = float(os.getenv("CAT_POOL_REFILL_SECONDS") or 1.0)
+FEED_MIN_INTERVAL = int(os.getenv("FEED_MIN_INTERVAL") or 60)
+FEED_MAX_INTERVAL = int(os.getenv("FEED_MAX_INTERVAL") or 6 * 3600)
+FEED_REQUESTS_PER_MINUTE = int(os.getenv("FEED_REQUESTS_PER_MINUTE") or 120)
+FEED_PUSH_FALLBACK_INTERVAL = int(os.getenv("FEED_PUSH_FALLBACK_INTERVAL") or 3600)
+WEBSUB_CALLBACK_URL = (os.getenv("WEBSUB_CALLBACK_URL") or "").strip() or None
+WEBSUB_HUB_URL = (os.getenv("WEBSUB_HUB_URL") or "").strip() or None  # None：使用 websub.DEFAULT_HUB_URL
+WEBSUB_SECRET = (os.getenv("WEBSUB_SECRET") or "").strip() or None
+WEBSUB_HOST = (os.getenv("WEBSUB_HOST") or "").strip() or "0.0.0.0"
+WEBSUB_PORT = int(os.getenv("WEBSUB_PORT") or 8080)
+STATE_DB_PATH = (os.getenv("STATE_DB_PATH") or "").strip() or os.path.join("data", "bot_state.sqlite3")
+STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL") or 5)
+TRIVIA_BANK_PATH = (os.getenv("TRIVIA_BANK_PATH") or "").strip() or None
+TRIVIA_ROUND_SECONDS = int(os.getenv("TRIVIA_ROUND_SECONDS") or 30)
+EXTRACTOR_WORKERS = int(os.getenv("EXTRACTOR_WORKERS") or 2)
+EXTRACTOR_QUEUE_LIMIT = int(os.getenv("EXTRACTOR_QUEUE_LIMIT") or 64)
+EXTRACTOR_GUILD_LIMIT = int(os.getenv("EXTRACTOR_GUILD_LIMIT") or 4)
+EXTRACTOR_TIMEOUT = float(os.getenv("EXTRACTOR_TIMEOUT") or 45)
+EXTRACTOR_MAX_JOBS = int(os.getenv("EXTRACTOR_MAX_JOBS") or 200)
+MUSIC_QUEUE_LIMIT = int(os.getenv("MUSIC_QUEUE_LIMIT") or 50)
+MUSIC_PREFETCH_SECONDS = float(os.getenv("MUSIC_PREFETCH_SECONDS") or 30)
+MUSIC_IDLE_SECONDS = float(os.getenv("MUSIC_IDLE_SECONDS") or 300)
+AUDIO_CACHE_DIR = (os.getenv("AUDIO_CACHE_DIR") or "").strip() or None
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB") or 2048)
+AUDIO_CACHE_MAX_DURATION = float(os.getenv("AUDIO_CACHE_MAX_DURATION") or 1200)
+
+# 指標：METRICS_PORT 設定後在 METRICS_HOST 開 /metrics（叢集模式下每個 worker 用 METRICS_PORT + CLUSTER_ID）
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)
+METRICS_HOST = (os.getenv("METRICS_HOST") or "").strip() or "127.0.0.1"
+
+# 上次同步到 Discord 的指令樹雜湊；刪掉這個檔案就會在下次啟動時強制重新同步
+COMMAND_HASH_PATH = (os.getenv("COMMAND_HASH_PATH") or "").strip() or os.path.join(
+    os.path.dirname(STATE_DB_PATH) or ".", "command_tree.sha256"
+)
+
+# 叢集模式：python -m src.cluster 會替每個 worker 設定這些值；單一行程執行時不必設定
+SHARD_COUNT = int(os.getenv("SHARD_COUNT") or 0)  # 0：不分片（或交給 Discord 決定）
+SHARD_IDS = [int(x) for x in (os.getenv("SHARD_IDS") or "").split(",") if x.strip()] or None
+CLUSTER_ID = int(os.getenv("CLUSTER_ID") or 0)
+CLUSTER_COUNT = int(os.getenv("CLUSTER_COUNT") or 1)
+CLUSTER_EVENT_INTERVAL = float(os.getenv("CLUSTER_EVENT_INTERVAL") or 5)
@@ -0,0 +1,107 @@
+"""
+Bot 本體與各功能共用的物件：Discord client、狀態資料庫與共用 HTTP 客戶端。
+各功能在 src/extensions/ 底下，以 discord.py 擴充的方式載入。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from .config import SHARD_COUNT, SHARD_IDS, STATE_DB_PATH
+from .http_client import HttpClient
+from .metrics import COMMAND_ERRORS, COMMAND_SECONDS
+from .storage import StateStore
+
+class _TimedResponse(discord.InteractionResponse):
+    """第一次回應完成時記下從收到互動開始經過的時間。"""
+
+    __slots__ = ("_command", "_started")
+
+    def __init__(self, parent: discord.Interaction, command: str, started: float):
+        super().__init__(parent)
+        self._command = command
+        self._started: float | None = started
+
+    def _record(self):
+        if self._started is not None:
+            COMMAND_SECONDS.observe(time.perf_counter() - self._started, self._command, "first_response")
+            self._started = None
+
+    async def defer(self, *args, **kwargs):
+        result = await super().defer(*args, **kwargs)
+        self._record()
+        return result
+
+    async def send_message(self, *args, **kwargs):
+        result = await super().send_message(*args, **kwargs)
+        self._record()
+        return result
+
+    async def edit_message(self, *args, **kwargs):
+        result = await super().edit_message(*args, **kwargs)
+        self._record()
+        return result
+
+    async def send_modal(self, *args, **kwargs):
+        result = await super().send_modal(*args, **kwargs)
+        self._record()
+        return result
+
+
+class TimedCommandTree(app_commands.CommandTree):
+    """斜線指令依最上層名稱（gif、play、rpg、trivia、autofeed…）記錄延遲與失敗次數。"""
+
+    async def _call(self, interaction: discord.Interaction):
+        if interaction.type is not discord.InteractionType.application_command:
+            return await super()._call(interaction)
+        command = (interaction.data or {}).get("name", "?")
+        started = time.perf_counter()
+        # interaction.response 是第一次存取時才建立的 cached slot：先放入會計時的版本
+        interaction._cs_response = _TimedResponse(interaction, command, started)
+        try:
+            await super()._call(interaction)
+        except Exception:
+            interaction.command_failed = True
+            raise
+        finally:
+            COMMAND_SECONDS.observe(time.perf_counter() - started, command, "total")
+            if interaction.command_failed:
+                COMMAND_ERRORS.inc(command)
+
+
+intents = discord.Intents.default()
+intents.guilds = True
+intents.voice_states = True
+
+if SHARD_COUNT:
+    # 叢集 worker：同一個行程負責 SHARD_IDS 這幾個分片，每個分片各自一條 gateway 連線
+    bot = commands.AutoShardedBot(
+        command_prefix="!",
+        intents=intents,
+        help_command=None,
+        tree_cls=TimedCommandTree,
+        shard_count=SHARD_COUNT,
+        shard_ids=SHARD_IDS,
+    )
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents, help_command=None, tree_cls=TimedCommandTree)
+
+# 所有狀態都存在 SQLite；記憶體中的表格照常讀寫，背景定期批次寫回
+store = StateStore(STATE_DB_PATH)
+
+
+async def get_session() -> HttpClient:
+    return bot.http_session
+
+
+async def stop_loops(*loops: tasks.Loop):
+    """取消背景迴圈並等它們真的結束；只 cancel() 的話，緊接著的 start() 會因舊工作還在而失敗。"""
+    pending = [loop.get_task() for loop in loops]
+    for loop in loops:
+        loop.cancel()
+    await asyncio.gather(*(task for task in pending if task is not None), return_exceptions=True)
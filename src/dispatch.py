@@ -0,0 +1,250 @@
+"""
+推播訊息的發送佇列：同一個目標頻道的多部新片合併成一則訊息，依路由節流。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import discord
+
+from .feeds import FeedEntry
+
+VIDEO_URL = "https://www.youtube.com/watch?v={video_id}"
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        """扣一個 token；回傳需要先等待的秒數。"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.per_second
+
+    def full(self, now: float) -> bool:
+        """已經補滿：和新建的 bucket 沒有差別，可以直接丟掉。"""
+        return self.tokens + (now - self.updated) * self.per_second >= self.capacity
+
+
+class ChannelCache:
+    """頻道物件快取；找不到的頻道也記下來（負快取），避免每次都打 API。"""
+
+    def __init__(self, client: discord.Client, max_size: int = 10000, negative_ttl: float = 600):
+        self.client = client
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self._channels: OrderedDict[int, discord.abc.Messageable] = OrderedDict()
+        self._missing: dict[int, float] = {}
+
+    def invalidate(self, channel_id: int):
+        self._channels.pop(channel_id, None)
+
+    def mark_missing(self, channel_id: int):
+        self._channels.pop(channel_id, None)
+        self._missing[channel_id] = time.monotonic() + self.negative_ttl
+
+    async def resolve(self, channel_id: int) -> discord.abc.Messageable | None:
+        """回傳可發訊息的頻道；頻道不存在時丟出 discord.NotFound。"""
+        cached = self._channels.get(channel_id)
+        if cached is not None:
+            self._channels.move_to_end(channel_id)
+            return cached
+        expires = self._missing.get(channel_id)
+        if expires is not None:
+            if expires > time.monotonic():
+                return None
+            del self._missing[channel_id]
+
+        channel = self.client.get_channel(channel_id)
+        if channel is None:
+            try:
+                channel = await self.client.fetch_channel(channel_id)
+            except discord.NotFound:
+                self.mark_missing(channel_id)
+                raise
+            except discord.Forbidden:
+                self.mark_missing(channel_id)
+                return None
+        if not isinstance(channel, discord.abc.Messageable):
+            self.mark_missing(channel_id)
+            return None
+        self._channels[channel_id] = channel
+        if len(self._channels) > self.max_size:
+            self._channels.popitem(last=False)
+        return channel
+
+
+def build_messages(entries: list[FeedEntry]) -> list[dict]:
+    """一部影片維持原本的文字格式；多部則合併成多 embed 訊息（每則最多 10 個）。"""
+    if len(entries) == 1:
+        entry = entries[0]
+        return [{"content": f"新影片發布：{entry.title}\n{VIDEO_URL.format(video_id=entry.video_id)}"}]
+    messages = []
+    for start in range(0, len(entries), 10):
+        chunk = entries[start:start + 10]
+        embeds = [
+            discord.Embed(title=entry.title[:256] or entry.video_id, url=VIDEO_URL.format(video_id=entry.video_id))
+            for entry in chunk
+        ]
+        messages.append({"content": f"新影片發布（{len(entries)} 部）：" if start == 0 else None, "embeds": embeds})
+    return messages
+
+
+@dataclass
+class _Batch:
+    entries: list[FeedEntry] = field(default_factory=list)
+    callbacks: list[Callable[[bool], None]] = field(default_factory=list)
+
+
+class AnnouncementDispatcher:
+    """
+    - enqueue() 只把影片放進該目標頻道的待發清單，不會等 API
+    - 每個目標頻道稍等 linger 秒再送出，期間累積的影片合併成同一則訊息
+    - 每個頻道（Discord 的 message 路由）各自一個 token bucket，另有全域上限；補滿的 bucket 定期清掉
+    - 送出（或放棄）後呼叫 enqueue 時給的 on_done(sent)，呼叫端據此推進「已推播」的紀錄
+    - 頻道已刪除時呼叫 on_dead_channel，讓呼叫端清掉指向它的追蹤
+    """
+
+    def __init__(
+        self,
+        client: discord.Client,
+        on_dead_channel: Callable[[int], None] | None = None,
+        linger: float = 1.0,
+        workers: int = 4,
+        per_channel: tuple[float, float] = (5, 1.0),
+        global_per_second: float = 40,
+    ):
+        self.channels = ChannelCache(client)
+        self.on_dead_channel = on_dead_channel
+        self.linger = linger
+        self.workers = workers
+        self.per_channel = per_channel
+        self._global = TokenBucket(global_per_second, global_per_second)
+        self._buckets: dict[int, TokenBucket] = {}
+        self._swept_at = time.monotonic()
+        self._pending: dict[int, _Batch] = {}
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self, timeout: float = 10):
+        """停止 worker，並在 timeout 秒內把還在等的推播送出；送不完的回報 sent=False。"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        drain = asyncio.ensure_future(self._drain())
+        try:
+            await asyncio.wait_for(drain, timeout)
+        except asyncio.TimeoutError:
+            pass
+        for target_id in list(self._pending):
+            self._finish(self._pending.pop(target_id), False)
+
+    async def _drain(self):
+        for target_id in list(self._pending):
+            try:
+                await self._flush(target_id)
+            except Exception as exc:
+                print(f"推播發送錯誤 (-> {target_id}): {exc}")
+
+    def enqueue(self, target_id: int, entries: list[FeedEntry], on_done: Callable[[bool], None] | None = None):
+        if not entries:
+            return
+        batch = self._pending.get(target_id)
+        if batch is None:
+            batch = self._pending[target_id] = _Batch()
+            asyncio.get_running_loop().call_later(self.linger, self._ready.put_nowait, target_id)
+        batch.entries.extend(entries)
+        if on_done is not None:
+            batch.callbacks.append(on_done)
+
+    @staticmethod
+    def _finish(batch: _Batch, sent: bool):
+        for callback in batch.callbacks:
+            try:
+                callback(sent)
+            except Exception as exc:
+                print(f"推播回呼錯誤: {exc}")
+
+    def _sweep_buckets(self, now: float):
+        self._swept_at = now
+        for target_id in [t for t, bucket in self._buckets.items() if bucket.full(now)]:
+            del self._buckets[target_id]
+
+    async def _pace(self, target_id: int):
+        now = time.monotonic()
+        if now - self._swept_at > 60:
+            self._sweep_buckets(now)
+        bucket = self._buckets.get(target_id)
+        if bucket is None:
+            bucket = self._buckets[target_id] = TokenBucket(*self.per_channel)
+        wait = max(bucket.delay(), self._global.delay())
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _worker(self):
+        while True:
+            target_id = await self._ready.get()
+            try:
+                await self._flush(target_id)
+            except Exception as exc:
+                print(f"推播發送錯誤 (-> {target_id}): {exc}")
+
+    def _drop(self, target_id: int):
+        batch = self._pending.pop(target_id, None)
+        if batch is not None:
+            self._finish(batch, False)
+
+    async def _flush(self, target_id: int):
+        if target_id not in self._pending:
+            return  # close() 時已經送過
+        try:
+            channel = await self.channels.resolve(target_id)
+        except discord.NotFound:
+            self._drop(target_id)
+            if self.on_dead_channel:
+                self.on_dead_channel(target_id)
+            return
+        except Exception:
+            self._drop(target_id)
+            raise
+        if channel is None:
+            self._drop(target_id)
+            return
+
+        # 等待節流的期間新進來的影片也會併入這次發送
+        await self._pace(target_id)
+        batch = self._pending.pop(target_id, None)
+        if batch is None:
+            return
+        sent = False
+        try:
+            for index, message in enumerate(build_messages(batch.entries)):
+                if index:
+                    await self._pace(target_id)
+                try:
+                    await channel.send(**message)
+                except discord.NotFound:
+                    self.channels.mark_missing(target_id)
+                    if self.on_dead_channel:
+                        self.on_dead_channel(target_id)
+                    return
+            sent = True
+        finally:
+            # 發送失敗或被取消都算沒送出，呼叫端下次再推
+            self._finish(batch, sent)
@@ -0,0 +1,6 @@
+"""
+各功能的 discord.py 擴充，啟動時依序載入，也可以用 /reload 單獨重新載入，不必重啟 Bot。
+重新載入時模組層級的狀態會重建：要保留的資料都在 SQLite，teardown 會先寫回。
+"""
+
+EXTENSIONS = ("gif", "rpg", "trivia", "autofeed", "music")
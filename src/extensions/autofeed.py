@@ -0,0 +1,354 @@
+"""
+/autofeed：追蹤 YouTube 頻道，新片推播到文字頻道（輪詢，另可選 WebSub 推送）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from .. import core
+from ..cluster import CLUSTERED, feed_owner, owns_feed, owns_guild
+from ..config import (
+    CLUSTER_EVENT_INTERVAL,
+    CLUSTER_ID,
+    FEED_MAX_INTERVAL,
+    FEED_MIN_INTERVAL,
+    FEED_PUSH_FALLBACK_INTERVAL,
+    FEED_REQUESTS_PER_MINUTE,
+    WEBSUB_CALLBACK_URL,
+    WEBSUB_HOST,
+    WEBSUB_HUB_URL,
+    WEBSUB_PORT,
+    WEBSUB_SECRET,
+)
+from ..core import get_session, store
+from ..dispatch import AnnouncementDispatcher
+from ..feed_events import FeedEventLog
+from ..feed_scheduler import FeedScheduler
+from ..feeds import FeedClient, FeedEntry, new_entries_since
+from ..metrics import FEED_POLL_FEEDS, FEED_POLL_SECONDS, FEED_RESULTS
+from ..storage import NestedCodec
+from ..websub import DEFAULT_HUB_URL, WebSubManager
+
+# guild_id -> YouTube 頻道 ID -> {"target": 文字頻道 ID, "last_video": 影片 ID}
+video_subscriptions = store.table(
+    NestedCodec(
+        "video_subscriptions", "guild_id", "channel_id", ("target", "last_video"),
+        encode=lambda meta: (meta["target"], meta.get("last_video")),
+        decode=lambda row: {"target": row[0], "last_video": row[1]},
+    )
+)
+
+
+feed_client = FeedClient()
+feed_scheduler = FeedScheduler(
+    min_interval=FEED_MIN_INTERVAL,
+    max_interval=FEED_MAX_INTERVAL,
+    requests_per_minute=FEED_REQUESTS_PER_MINUTE,
+    push_fallback_interval=FEED_PUSH_FALLBACK_INTERVAL,
+)
+
+# 叢集模式：負責輪詢的 worker 把 feed 快照寫進這裡，各 worker 推播給自己分片上的伺服器
+feed_events = FeedEventLog(store)
+
+
+async def fetch_latest_video(channel_id: str) -> tuple[str | None, str | None]:
+    session = await get_session()
+    result = await feed_client.fetch(session, channel_id, limit=1, conditional=False)
+    if result is None or not result.entries:
+        return None, None
+    latest = result.entries[0]
+    return latest.video_id, latest.title
+
+
+def _schedule_text(channel_id: str) -> str:
+    sched = feed_scheduler.get(channel_id)
+    if sched is None and CLUSTERED and not owns_feed(channel_id):
+        return f"｜由 worker {feed_owner(channel_id)} 輪詢"
+    if sched is None:
+        return "｜等待排程"
+    text = f"｜下次檢查 <t:{int(sched.next_due)}:R>"
+    if sched.cadence:
+        text += f"，約每 {sched.cadence / 3600:.1f} 小時上片"
+    if sched.push_active:
+        text += "，WebSub 推送中"
+    if sched.failures:
+        text += f"，連續失敗 {sched.failures} 次"
+    return text
+
+
+class AutoFeed(app_commands.Group):
+    def __init__(self):
+        super().__init__(name="autofeed", description="自動推播 YouTube 新影片")
+
+    @app_commands.command(name="add", description="新增追蹤頻道")
+    @app_commands.describe(channel_id="YouTube 頻道 ID", target="推播到的文字頻道")
+    async def add(self, interaction: discord.Interaction, channel_id: str, target: discord.TextChannel):
+        await interaction.response.defer(ephemeral=True)
+        vid, title = await fetch_latest_video(channel_id)
+        if not vid:
+            await interaction.edit_original_response(content="無法取得影片，請確認頻道 ID。")
+            return
+        guild_map = video_subscriptions.setdefault(interaction.guild_id or 0, {})
+        guild_map[channel_id] = {"target": target.id, "last_video": vid}
+        video_subscriptions.touch(interaction.guild_id or 0, channel_id)
+        await interaction.edit_original_response(content=f"已追蹤頻道 {channel_id}；目前最新：{title}")
+
+    @app_commands.command(name="remove", description="移除追蹤頻道")
+    @app_commands.describe(channel_id="YouTube 頻道 ID")
+    async def remove(self, interaction: discord.Interaction, channel_id: str):
+        guild_map = video_subscriptions.setdefault(interaction.guild_id or 0, {})
+        existed = guild_map.pop(channel_id, None)
+        video_subscriptions.touch(interaction.guild_id or 0, channel_id)
+        await interaction.response.send_message("已移除。" if existed else "未找到此頻道。", ephemeral=True)
+
+    @app_commands.command(name="list", description="列出追蹤頻道")
+    async def list(self, interaction: discord.Interaction):
+        guild_map = video_subscriptions.get(interaction.guild_id or 0, {})
+        if not guild_map:
+            await interaction.response.send_message("目前沒有追蹤任何頻道。")
+            return
+        lines = [
+            f"ID: {cid} -> <#{meta['target']}> (最後推播: {meta['last_video']}){_schedule_text(cid)}"
+            for cid, meta in guild_map.items()
+        ]
+        await interaction.response.send_message("\n".join(lines))
+
+
+FEED_FETCH_CONCURRENCY = 16
+
+
+def _collect_feed_subscribers() -> dict[str, list[tuple[int, dict]]]:
+    # 同一個 YouTube 頻道可能被很多伺服器追蹤：收斂成唯一頻道 ID，每輪只抓一次 feed
+    subscribers: dict[str, list[tuple[int, dict]]] = {}
+    for guild_id, feeds in list(video_subscriptions.items()):
+        for channel_id, meta in list(feeds.items()):
+            subscribers.setdefault(channel_id, []).append((guild_id, meta))
+    return subscribers
+
+
+def _tracked_channels(subscribers: dict[str, list[tuple[int, dict]]]) -> set[str]:
+    # 叢集模式下記憶體裡只有自己分片的伺服器，其他 worker 追蹤的頻道從資料庫讀
+    if not CLUSTERED:
+        return set(subscribers)
+    rows = store.reader.execute("SELECT DISTINCT channel_id FROM video_subscriptions").fetchall()
+    return {row[0] for row in rows} | subscribers.keys()
+
+
+def _feed_channels(subscribers: dict[str, list[tuple[int, dict]]]) -> list[str]:
+    """這個 worker 要輪詢的頻道：叢集模式下每個頻道只分給一個 worker。"""
+    return [channel_id for channel_id in _tracked_channels(subscribers) if not CLUSTERED or owns_feed(channel_id)]
+
+
+def _subscribers_of(channel_id: str) -> list[tuple[int, dict]]:
+    return [
+        (guild_id, feeds[channel_id])
+        for guild_id, feeds in list(video_subscriptions.items())
+        if channel_id in feeds
+    ]
+
+
+def _prune_dead_target(target_id: int):
+    # 目標文字頻道已被刪除：移除所有指向它的追蹤
+    for guild_id, feeds in list(video_subscriptions.items()):
+        for channel_id, meta in list(feeds.items()):
+            if meta.get("target") == target_id:
+                feeds.pop(channel_id, None)
+                video_subscriptions.touch(guild_id, channel_id)
+                print(f"推播目標頻道 {target_id} 已不存在，移除追蹤 {channel_id} (guild={guild_id})")
+
+
+dispatcher = AnnouncementDispatcher(core.bot, on_dead_channel=_prune_dead_target)
+
+
+# (guild_id, YouTube 頻道 ID) -> 已交給 dispatcher、還沒送出的最新影片；送出後才寫進 last_video
+_in_flight: dict[tuple[int, str], str] = {}
+# 發送失敗、要重抓完整 feed 的 YouTube 頻道：feed 的 ETag 已經記下，不清掉的話之後只會拿到 304，
+# 沒送出的影片就再也不會推播（停機時沒送出的則靠重啟後第一次的完整抓取）
+_refetch: set[str] = set()
+
+
+def _on_announced(guild_id: int, channel_id: str, meta: dict, video_id: str) -> Callable[[bool], None]:
+    def done(sent: bool):
+        key = (guild_id, channel_id)
+        if _in_flight.get(key) == video_id:
+            del _in_flight[key]
+        # 送出前可能已被 /autofeed remove 移除或重新設定
+        if video_subscriptions.get(guild_id, {}).get(channel_id) is not meta:
+            return
+        if sent:
+            meta["last_video"] = video_id
+            video_subscriptions.touch(guild_id, channel_id)
+        else:
+            _refetch.add(channel_id)
+
+    return done
+
+
+async def _announce_videos(
+    channel_id: str, entries: list[FeedEntry], subscribers: list[tuple[int, dict]], partial: bool = False
+):
+    for guild_id, meta in subscribers:
+        # 輪詢期間可能已被 /autofeed remove 移除
+        if video_subscriptions.get(guild_id, {}).get(channel_id) is not meta:
+            continue
+        key = (guild_id, channel_id)
+        fresh = new_entries_since(entries, _in_flight.get(key) or meta.get("last_video"), partial)
+        if not fresh:
+            continue
+        newest = fresh[-1].video_id
+        _in_flight[key] = newest
+        dispatcher.enqueue(meta["target"], fresh, _on_announced(guild_id, channel_id, meta, newest))
+
+
+async def _schedule_refetches(now: float):
+    # 丟掉驗證值再排一次輪詢（間隔至少 min_interval，推播目標一直失敗時不會每個 tick 都抓）；
+    # 叢集模式下不是自己負責的頻道請負責的 worker 重抓，它發布的完整快照會讓各 worker 重試
+    for channel_id in list(_refetch):
+        _refetch.discard(channel_id)
+        if CLUSTERED and not owns_feed(channel_id):
+            await feed_events.poke(channel_id)
+            continue
+        feed_client.forget(channel_id)
+        feed_scheduler.poll_soon(channel_id, now, delay=feed_scheduler.min_interval)
+
+
+@tasks.loop(seconds=15)
+async def poll_videos():
+    # 每個 tick 只檢查排程到期的頻道；沒人追蹤時排程會被清空
+    subscribers = _collect_feed_subscribers()
+    now = time.time()
+    feed_scheduler.sync(_feed_channels(subscribers), now)
+    await _schedule_refetches(now)
+    due = feed_scheduler.pop_due(now)
+    if not due:
+        return
+    started = time.perf_counter()
+    session = await get_session()
+    pending: asyncio.Queue[str] = asyncio.Queue()
+    for channel_id in due:
+        pending.put_nowait(channel_id)
+
+    # 固定數量的 worker 共用一個佇列：慢的 feed 只會卡住自己那個 worker
+    async def worker():
+        while True:
+            try:
+                channel_id = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            subs = subscribers.get(channel_id, [])
+            sched = feed_scheduler.get(channel_id)
+            # 讀到所有訂閱者的 last_video 就停止解析；還沒推估出頻率時讀完整份 feed
+            # 叢集模式下看不到其他 worker 伺服器的 last_video，一律讀完整份
+            stop_at: set[str] = set()
+            if not CLUSTERED and sched is not None and sched.cadence is not None:
+                stop_at = {meta["last_video"] for _, meta in subs if meta.get("last_video")}
+            try:
+                result = await feed_client.fetch(session, channel_id, stop_at=stop_at)
+            except Exception as exc:
+                print(f"推播輪詢錯誤 ({channel_id}): {exc}")
+                result = None
+            if result is None:
+                FEED_RESULTS.inc("failed")
+                feed_scheduler.record_failure(channel_id, time.time())
+                continue
+            FEED_RESULTS.inc("changed" if result.entries else "not_modified")
+            feed_scheduler.record_success(channel_id, result.entries, time.time())
+            if result.entries and CLUSTERED:
+                await feed_events.publish(channel_id, result.entries)
+            elif result.entries:
+                await _announce_videos(channel_id, result.entries, subs)
+
+    workers = min(FEED_FETCH_CONCURRENCY, len(due))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    FEED_POLL_SECONDS.observe(time.perf_counter() - started)
+    FEED_POLL_FEEDS.observe(len(due))
+
+
+@tasks.loop(seconds=CLUSTER_EVENT_INTERVAL)
+async def consume_feed_events():
+    snapshots, pokes = feed_events.read_new()
+    now = time.time()
+    for channel_id in pokes:
+        # 其他 worker 推播失敗時也會送來：重抓完整 feed 而不是拿 304
+        if owns_feed(channel_id):
+            feed_client.forget(channel_id)
+        feed_scheduler.poll_soon(channel_id, now)  # 不是自己負責的頻道不在排程裡，會被忽略
+    for channel_id, entries in snapshots.items():
+        subs = _subscribers_of(channel_id)
+        if subs:
+            await _announce_videos(channel_id, entries, subs)
+
+
+@tasks.loop(hours=1)
+async def prune_feed_events():
+    await feed_events.prune()
+
+
+async def _handle_pushed_entries(channel_id: str, entries: list[FeedEntry]):
+    if CLUSTERED:
+        # 請負責這個頻道的 worker 立刻輪詢，由它發布快照，推播仍走事件表
+        await feed_events.poke(channel_id)
+        return
+    # hub 也會在舊影片改標題時推送：只接受比目前已知最新上片更新的項目
+    sched = feed_scheduler.get(channel_id)
+    if sched is not None and sched.last_upload is not None:
+        entries = [e for e in entries if e.published is None or e.published > sched.last_upload]
+    if not entries:
+        return
+    entries.sort(key=lambda e: e.published or 0, reverse=True)
+    await _announce_videos(channel_id, entries, _subscribers_of(channel_id), partial=True)
+    feed_scheduler.note_entries(channel_id, entries)
+
+
+# 叢集模式下只有 worker 0 開 WebSub 接收端（回呼網址只有一個）
+websub: WebSubManager | None = None
+if WEBSUB_CALLBACK_URL and CLUSTER_ID == 0:
+    websub = WebSubManager(
+        WEBSUB_CALLBACK_URL,
+        on_entries=_handle_pushed_entries,
+        hub_url=WEBSUB_HUB_URL or DEFAULT_HUB_URL,
+        secret=WEBSUB_SECRET,
+        on_lease_change=feed_scheduler.set_push_active,
+    )
+
+
+@tasks.loop(minutes=5)
+async def maintain_websub():
+    if websub is None:
+        return
+    channel_ids = _tracked_channels(_collect_feed_subscribers())
+    websub.sync(channel_ids)
+    for channel_id in channel_ids:
+        feed_scheduler.set_push_active(channel_id, websub.is_active(channel_id))
+    await websub.maintain(await get_session())
+
+
+async def setup(bot: commands.Bot):
+    store.attach(video_subscriptions)
+    # 輪詢需要完整的追蹤清單；叢集模式下只載入自己分片上的伺服器
+    video_subscriptions.preload(where=lambda guild_id, _: owns_guild(guild_id))
+    dispatcher.start()
+    poll_videos.start()
+    if CLUSTERED:
+        consume_feed_events.start()
+        if CLUSTER_ID == 0:
+            prune_feed_events.start()
+    if websub is not None:
+        await websub.start(WEBSUB_HOST, WEBSUB_PORT)
+        maintain_websub.start()
+    bot.tree.add_command(AutoFeed())
+
+
+async def teardown(bot: commands.Bot):
+    await core.stop_loops(poll_videos, consume_feed_events, prune_feed_events, maintain_websub)
+    await dispatcher.close()
+    if websub is not None:
+        await websub.close()
+    await store.release(video_subscriptions)
@@ -0,0 +1,83 @@
+"""
+/gif：Tenor 搜尋（結果快取），沒有金鑰或沒結果時改用預熱好的隨機貓咪 GIF。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+
+import aiohttp
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ..cache import AsyncTTLCache
+from ..config import CAT_POOL_REFILL_SECONDS, CAT_POOL_SIZE, TENOR_CACHE_TTL, TENOR_KEY, TENOR_NEGATIVE_TTL
+from ..core import get_session
+from ..gif_pool import CataasResolver, UrlPool, fallback_url
+
+# 正規化後的關鍵字 -> Tenor 結果的 GIF 網址；沒結果或出錯也短暫記住，避免一直重打
+tenor_cache: AsyncTTLCache[list[str]] = AsyncTTLCache(max_entries=1024, ttl=TENOR_CACHE_TTL)
+
+
+cat_pool = UrlPool(CataasResolver(get_session), size=CAT_POOL_SIZE, refill_interval=CAT_POOL_REFILL_SECONDS)
+
+
+async def search_tenor(query: str) -> list[str]:
+    session = await get_session()
+    params = {
+        "q": query,
+        "key": TENOR_KEY,
+        "limit": 10,
+        "contentfilter": "medium",
+        "media_filter": "gif",
+    }
+    try:
+        async with session.get("https://tenor.googleapis.com/v2/search", params=params) as resp:
+            if resp.status >= 400:
+                return []
+            data = await resp.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        return []
+    urls = []
+    for picked in data.get("results", []):
+        url = picked.get("media_formats", {}).get("gif", {}).get("url") or picked.get("itemurl")
+        if url:
+            urls.append(url)
+    return urls
+
+
+async def fetch_gif(query: str) -> str:
+    # 首選 Tenor（需 API key），否則改用免費的 cataas 隨機貓咪 GIF 當簡易替代
+    if TENOR_KEY:
+        key = " ".join(query.casefold().split())
+        urls = await tenor_cache.get_or_load(
+            key,
+            lambda: search_tenor(query),
+            ttl=lambda found: TENOR_CACHE_TTL if found else TENOR_NEGATIVE_TTL,
+        )
+        if urls:
+            return random.choice(urls)
+    # fallback：不需金鑰，提供一張隨機貓咪 GIF（由背景預熱池供應）
+    return cat_pool.take() or fallback_url()
+
+
+@app_commands.command(name="gif", description="生成或搜尋一張 GIF")
+@app_commands.describe(prompt="想要的主題，例如 happy cat")
+async def gif(interaction: discord.Interaction, prompt: str):
+    await interaction.response.defer()
+    # 一定有圖：Tenor 沒結果時退回隨機貓咪 GIF
+    url = await fetch_gif(prompt)
+    embed = discord.Embed(title=f"GIF: {prompt}")
+    embed.set_image(url=url)
+    await interaction.edit_original_response(embed=embed)
+
+
+async def setup(bot: commands.Bot):
+    cat_pool.start()
+    bot.tree.add_command(gif)
+
+
+async def teardown(bot: commands.Bot):
+    await cat_pool.close()
@@ -0,0 +1,248 @@
+"""
+/play、/skip、/queue、/nowplaying、/musiccache：每個伺服器一個播放佇列。
+yt-dlp 擷取在子行程池中進行，第一次 /play 時才啟動（也才載入 yt_dlp）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ..audio_cache import AudioCache
+from ..cache import AsyncTTLCache
+from ..config import (
+    AUDIO_CACHE_DIR,
+    AUDIO_CACHE_MAX_DURATION,
+    AUDIO_CACHE_MAX_MB,
+    EXTRACTOR_GUILD_LIMIT,
+    EXTRACTOR_MAX_JOBS,
+    EXTRACTOR_QUEUE_LIMIT,
+    EXTRACTOR_TIMEOUT,
+    EXTRACTOR_WORKERS,
+    MUSIC_IDLE_SECONDS,
+    MUSIC_PREFETCH_SECONDS,
+    MUSIC_QUEUE_LIMIT,
+)
+from ..extractor import (
+    YDL_OPTS,
+    ExtractedTrack,
+    ExtractorBusy,
+    ExtractorPool,
+    extract_track,
+    normalize_query,
+    track_ttl,
+)
+from ..metrics import EXTRACT_SECONDS
+from ..music import GuildPlayer, QueuedTrack, QueueFull, open_source
+
+# 查詢 -> 擷取結果；依串流網址的 expire 參數決定存活時間，同一查詢同時只擷取一次
+extraction_cache: AsyncTTLCache[ExtractedTrack] = AsyncTTLCache(max_entries=2048)
+# EXTRACTOR_WORKERS=0 時不開子行程，退回預設的執行緒 executor
+extractor_pool = (
+    ExtractorPool(
+        YDL_OPTS,
+        workers=EXTRACTOR_WORKERS,
+        max_queue=EXTRACTOR_QUEUE_LIMIT,
+        per_guild=EXTRACTOR_GUILD_LIMIT,
+        timeout=EXTRACTOR_TIMEOUT,
+        max_jobs=EXTRACTOR_MAX_JOBS,
+    )
+    if EXTRACTOR_WORKERS > 0
+    else None
+)
+
+
+# 選用：常播的歌存到本機（AUDIO_CACHE_DIR 有設定才啟用）
+audio_cache = (
+    AudioCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB * 1024 * 1024, max_duration=AUDIO_CACHE_MAX_DURATION)
+    if AUDIO_CACHE_DIR
+    else None
+)
+
+
+def _extract_in_thread(query: str) -> ExtractedTrack:
+    # 和 worker pool 一樣只計 yt-dlp 實際執行的時間，不含排隊
+    started = time.perf_counter()
+    try:
+        track = extract_track(query, YDL_OPTS)
+    except Exception:
+        EXTRACT_SECONDS.observe(time.perf_counter() - started, "error")
+        raise
+    EXTRACT_SECONDS.observe(time.perf_counter() - started, "ok")
+    return track
+
+
+async def resolve_track(query: str, guild_id: int) -> ExtractedTrack:
+    key = normalize_query(query)
+    if audio_cache is not None and key.startswith("yt:"):
+        cached = audio_cache.get(key[3:])
+        if cached is not None:
+            return cached
+
+    async def load() -> ExtractedTrack:
+        if extractor_pool is not None:
+            return await extractor_pool.extract(guild_id, query)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _extract_in_thread, query)
+
+    track = await extraction_cache.get_or_load(key, load, ttl=track_ttl)
+    if track.video_id and key != f"yt:{track.video_id}":
+        # 關鍵字搜尋的結果也記在影片 ID 底下，之後貼連結可直接命中
+        extraction_cache.set(f"yt:{track.video_id}", track, track_ttl(track))
+    return track
+
+
+async def _ensure_voice(interaction: discord.Interaction) -> discord.VoiceClient | None:
+    if not isinstance(interaction.user, discord.Member):
+        await interaction.response.send_message("需要在伺服器中使用此指令。", ephemeral=True)
+        return None
+    if not interaction.user.voice or not interaction.user.voice.channel:
+        await interaction.response.send_message("請先加入語音頻道。", ephemeral=True)
+        return None
+    voice_client = interaction.guild.voice_client if interaction.guild else None
+    if voice_client and voice_client.channel == interaction.user.voice.channel:
+        return voice_client
+    try:
+        return await interaction.user.voice.channel.connect()
+    except Exception:
+        await interaction.response.send_message("無法連線語音頻道，請確認機器人權限。", ephemeral=True)
+        return None
+
+
+music_players: dict[int, GuildPlayer] = {}
+
+
+async def _open_track(track: ExtractedTrack) -> discord.AudioSource:
+    if audio_cache is not None:
+        source = audio_cache.open(track)
+        if source is not None:
+            return source
+    return await open_source(track)
+
+
+def _player_for(guild_id: int) -> GuildPlayer:
+    player = music_players.get(guild_id)
+    if player is None:
+        player = music_players[guild_id] = GuildPlayer(
+            guild_id,
+            resolve_track,
+            on_close=lambda gid: music_players.pop(gid, None),
+            open_source=_open_track,
+            max_queue=MUSIC_QUEUE_LIMIT,
+            prefetch_lead=MUSIC_PREFETCH_SECONDS,
+            idle_timeout=MUSIC_IDLE_SECONDS,
+        )
+    return player
+
+
+def _format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "?"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+@app_commands.command(name="play", description="播放 YouTube 音樂（可貼連結或輸入關鍵字）")
+@app_commands.describe(query="YouTube 連結，或輸入關鍵字我幫你搜尋")
+async def play(interaction: discord.Interaction, query: str):
+    voice = await _ensure_voice(interaction)
+    if not voice:
+        return
+    await interaction.response.defer()
+
+    try:
+        track = await resolve_track(query, interaction.guild_id)
+    except ExtractorBusy:
+        await interaction.edit_original_response(content="目前點歌的人太多了，請稍後再試。")
+        return
+    except Exception as exc:
+        await interaction.edit_original_response(content=f"抓取音訊失敗：{exc}")
+        return
+
+    player = _player_for(interaction.guild_id)
+    try:
+        position = player.enqueue(voice, QueuedTrack(query, track, interaction.user.id))
+    except QueueFull:
+        await interaction.edit_original_response(content=f"佇列已滿（最多 {player.max_queue} 首）。")
+        return
+    if position == 0:
+        await interaction.edit_original_response(content=f"正在播放：{track.title}")
+    else:
+        await interaction.edit_original_response(content=f"已加入佇列（第 {position} 首）：{track.title}")
+
+
+@app_commands.command(name="skip", description="跳過目前播放的歌曲")
+async def skip(interaction: discord.Interaction):
+    player = music_players.get(interaction.guild_id)
+    skipped = player.skip() if player else None
+    if skipped is None:
+        await interaction.response.send_message("目前沒有在播放。", ephemeral=True)
+        return
+    await interaction.response.send_message(f"已跳過：{skipped.track.title}")
+
+
+@app_commands.command(name="queue", description="查看播放佇列")
+async def queue(interaction: discord.Interaction):
+    player = music_players.get(interaction.guild_id)
+    if player is None or (player.current is None and not player.queue):
+        await interaction.response.send_message("佇列是空的。", ephemeral=True)
+        return
+    lines = []
+    if player.current is not None:
+        lines.append(f"▶ {player.current.track.title}（{_format_duration(player.current.track.duration)}）")
+    for index, item in enumerate(list(player.queue)[:10], start=1):
+        lines.append(f"{index}. {item.track.title}（{_format_duration(item.track.duration)}）")
+    if len(player.queue) > 10:
+        lines.append(f"…還有 {len(player.queue) - 10} 首")
+    await interaction.response.send_message("\n".join(lines))
+
+
+@app_commands.command(name="nowplaying", description="目前播放的歌曲")
+async def nowplaying(interaction: discord.Interaction):
+    player = music_players.get(interaction.guild_id)
+    if player is None or player.current is None:
+        await interaction.response.send_message("目前沒有在播放。", ephemeral=True)
+        return
+    track = player.current.track
+    progress = f"{_format_duration(player.elapsed())} / {_format_duration(track.duration)}"
+    link = f"\n{track.webpage_url}" if track.webpage_url else ""
+    await interaction.response.send_message(
+        f"正在播放：{track.title}（{progress}，由 <@{player.current.requester_id}> 點播）{link}",
+        allowed_mentions=discord.AllowedMentions.none(),
+    )
+
+
+@app_commands.command(name="musiccache", description="查看音樂快取的命中率與磁碟用量")
+async def musiccache(interaction: discord.Interaction):
+    extraction = extraction_cache.stats()
+    lines = [f"擷取快取：{extraction['entries']} 筆，命中 {extraction['hits']}／未命中 {extraction['misses']}"]
+    if audio_cache is None:
+        lines.append("本機音訊快取：未啟用（設定 AUDIO_CACHE_DIR 以啟用）")
+    else:
+        stats = audio_cache.stats()
+        lines.append(
+            f"本機音訊快取：{stats['entries']} 首，{stats['bytes'] / 1048576:.1f} / {stats['max_bytes'] / 1048576:.0f} MB，"
+            f"命中 {stats['hits']}／未命中 {stats['misses']}，下載中 {stats['filling']}，失敗 {stats['failures']}"
+        )
+    await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    if audio_cache is not None:
+        audio_cache.start()
+    for command in (play, skip, queue, nowplaying, musiccache):
+        bot.tree.add_command(command)
+
+
+async def teardown(bot: commands.Bot):
+    for player in list(music_players.values()):
+        await player.close()
+    if extractor_pool is not None:
+        await extractor_pool.close()
+    if audio_cache is not None:
+        await audio_cache.close()
@@ -0,0 +1,135 @@
+"""
+/rpg 與 RPG 按鈕面板；規則與行動處理在 src/rpg.py。
+"""
+
+from __future__ import annotations
+
+import re
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ..cluster import CLUSTERED
+from ..core import store
+from ..rpg import PlayerState, apply_action, new_player
+from ..storage import JsonCodec
+
+# 以使用者為 key，叢集模式下同一個玩家可能在不同 worker 上操作（不同伺服器、私訊）：
+# 每次都從資料庫讀最新的進度，行動後立刻寫回
+rpg_state = store.table(
+    JsonCodec("rpg_players", "user_id", encode=PlayerState.to_dict, decode=PlayerState.from_dict),
+    shared=CLUSTERED,
+)
+
+
+def run_rpg_action(user_id: int, action: str) -> tuple[str, bool]:
+    """回傳（訊息, 狀態是否有變）；只看狀態或沒有效果的行動（沒藥水、錢不夠…）不寫回。"""
+    if action == "start":
+        rpg_state[user_id] = new_player()
+        return "冒險開始！用 /rpg explore 出門探索吧。", True
+    if user_id not in rpg_state:
+        rpg_state[user_id] = new_player()  # 已標記為待寫回
+        return apply_action(rpg_state[user_id], action), True
+    state = rpg_state[user_id]
+    before = state.to_dict()
+    text = apply_action(state, action)
+    if state.to_dict() == before:
+        return text, False
+    rpg_state.touch(user_id)
+    return text, True
+
+
+async def _persist_rpg(changed: bool):
+    if CLUSTERED and changed:
+        await store.flush()
+
+
+RPG_BUTTONS = {
+    "explore": "探索",
+    "fight": "戰鬥",
+    "flee": "逃跑",
+    "rest": "休息",
+    "potion": "喝藥",
+    "shop": "商店",
+    "status": "狀態",
+    "help": "幫助",
+}
+
+
+class RPGButton(discord.ui.DynamicItem[discord.ui.Button], template=r"rpg:(?P<action>[a-z]+):(?P<owner>[0-9]+)"):
+    """
+    RPG 面板上的按鈕。custom_id 帶著行動與擁有者（rpg:<action>:<user_id>），
+    點擊時才由 custom_id 還原，不必為每則訊息保留 View；Bot 重啟後舊訊息上的按鈕也照樣能用。
+    """
+
+    def __init__(self, action: str, owner_id: int):
+        super().__init__(
+            discord.ui.Button(
+                label=RPG_BUTTONS.get(action, action),
+                style=discord.ButtonStyle.primary,
+                custom_id=f"rpg:{action}:{owner_id}",
+            )
+        )
+        self.action = action
+        self.owner_id = owner_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match[str]):
+        return cls(match["action"], int(match["owner"]))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # 只比對 custom_id 裡的數字，不碰玩家狀態
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("這不是你的冒險進度喔。", ephemeral=True)
+            return False
+        if self.action not in RPG_BUTTONS:
+            await interaction.response.send_message("這個按鈕已經失效了，請重新使用 /rpg。", ephemeral=True)
+            return False
+        return True
+
+    async def callback(self, interaction: discord.Interaction):
+        text, changed = run_rpg_action(self.owner_id, self.action)
+        # 不帶 view：訊息上的按鈕維持原樣
+        await interaction.response.edit_message(content=text)
+        await _persist_rpg(changed)
+
+
+def rpg_panel(owner_id: int) -> discord.ui.View:
+    view = discord.ui.View(timeout=None)
+    for action in RPG_BUTTONS:
+        view.add_item(RPGButton(action, owner_id))
+    # 只當作送出元件用的容器：停止後不會進 ViewStore，點擊一律交給已註冊的 RPGButton
+    view.stop()
+    return view
+
+
+@app_commands.command(name="rpg", description="簡易文字 RPG")
+@app_commands.choices(
+    action=[
+        app_commands.Choice(name="start", value="start"),
+        app_commands.Choice(name="help", value="help"),
+        app_commands.Choice(name="explore", value="explore"),
+        app_commands.Choice(name="fight", value="fight"),
+        app_commands.Choice(name="flee", value="flee"),
+        app_commands.Choice(name="rest", value="rest"),
+        app_commands.Choice(name="potion", value="potion"),
+        app_commands.Choice(name="shop", value="shop"),
+        app_commands.Choice(name="status", value="status"),
+    ]
+)
+async def rpg(interaction: discord.Interaction, action: app_commands.Choice[str]):
+    result, changed = run_rpg_action(interaction.user.id, action.value)
+    await interaction.response.send_message(result, view=rpg_panel(interaction.user.id))
+    await _persist_rpg(changed)
+
+
+async def setup(bot: commands.Bot):
+    store.attach(rpg_state)
+    bot.add_dynamic_items(RPGButton)
+    bot.tree.add_command(rpg)
+
+
+async def teardown(bot: commands.Bot):
+    bot.remove_dynamic_items(RPGButton)
+    await store.release(rpg_state)
@@ -0,0 +1,256 @@
+"""
+/trivia：限時知識問答與各伺服器排行榜。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+
+from .. import core
+from ..cluster import owns_guild
+from ..config import TRIVIA_BANK_PATH, TRIVIA_ROUND_SECONDS
+from ..core import store
+from ..dispatch import ChannelCache
+from ..leaderboard import Leaderboard
+from ..storage import JsonCodec, NestedCodec
+from ..timer_wheel import TimerWheel
+from ..trivia_bank import LABELS, ListBank, MmapBank, ShuffleBag, TriviaBank
+
+TRIVIA_QUESTIONS: list[dict] = [
+    {"question": "地球上最大的海洋是？", "choices": ["大西洋", "印度洋", "太平洋", "北冰洋"], "answer": "C"},
+    {"question": "貓咪發出咕嚕聲通常代表？", "choices": ["很生氣", "很緊張", "覺得放鬆", "聽到雷聲"], "answer": "C"},
+    {"question": "一年有幾個月是 31 天？", "choices": ["6", "7", "8", "9"], "answer": "B"},
+    {"question": "哪個不是「水果」？（按常見食物分類）", "choices": ["番茄", "蘋果", "香蕉", "葡萄"], "answer": "A"},
+    {"question": "「哈利波特」的學校叫什麼？", "choices": ["霍格華茲", "魔法森林學院", "阿茲卡班", "德姆蘭"], "answer": "A"},
+    {"question": "太陽系中最接近太陽的行星是？", "choices": ["水星", "金星", "地球", "火星"], "answer": "A"},
+    {"question": "下列哪個是哺乳類？", "choices": ["鯊魚", "海豚", "章魚", "海星"], "answer": "B"},
+    {"question": "「一公尺」等於幾公分？", "choices": ["10", "100", "1000", "10000"], "answer": "B"},
+    {"question": "披薩最常見的切法是？", "choices": ["正方形", "三角形", "圓形", "星形"], "answer": "B"},
+    {"question": "台灣常見的便利商店不包含？", "choices": ["7-ELEVEN", "全家", "萊爾富", "Costco"], "answer": "D"},
+    {"question": "「OK」手勢通常代表？", "choices": ["不行", "可以", "快跑", "別說話"], "answer": "B"},
+    {"question": "下列哪個顏色不是彩虹的七色之一？", "choices": ["紅", "橙", "粉", "紫"], "answer": "C"},
+    {"question": "一天有幾小時？", "choices": ["12", "18", "24", "36"], "answer": "C"},
+    {"question": "「熊貓」最常吃的是？", "choices": ["竹子", "魚", "肉", "果子"], "answer": "A"},
+    {"question": "世界上使用人口最多的語言是？（以母語人口常見說法）", "choices": ["英文", "西班牙文", "中文", "法文"], "answer": "C"},
+    {"question": "打招呼最常見的時間用語：早上好對應？", "choices": ["Good night", "Good morning", "Good bye", "Good luck"], "answer": "B"},
+    {"question": "下列哪個是「行星」不是「恆星」？", "choices": ["太陽", "北極星", "火星", "天狼星"], "answer": "C"},
+    {"question": "「剪刀石頭布」中，剪刀贏什麼？", "choices": ["石頭", "布", "剪刀", "全部"], "answer": "B"},
+    {"question": "哪個是常見的社群平台？", "choices": ["Discord", "Photoshop", "Excel", "Notepad"], "answer": "A"},
+    {"question": "「番茄醬」常見的主要原料是？", "choices": ["蘋果", "番茄", "紅蘿蔔", "辣椒"], "answer": "B"},
+    {"question": "下列哪個動物會冬眠？", "choices": ["熊（部分種類）", "長頸鹿", "海馬", "鴿子"], "answer": "A"},
+    {"question": "「金字塔」最有名的所在地是？", "choices": ["希臘", "埃及", "日本", "巴西"], "answer": "B"},
+    {"question": "下列哪個是樂器？", "choices": ["小提琴", "望遠鏡", "指南針", "吸塵器"], "answer": "A"},
+    {"question": "常見的「紅綠燈」綠燈表示？", "choices": ["停", "慢", "走", "倒退"], "answer": "C"},
+]
+
+
+# 有設定 TRIVIA_BANK_PATH 就用外部 mmap 題庫，否則用上面的內建題目
+trivia_bank: TriviaBank = MmapBank(TRIVIA_BANK_PATH) if TRIVIA_BANK_PATH else ListBank(TRIVIA_QUESTIONS)
+trivia_bag = ShuffleBag(trivia_bank)
+trivia_bags = store.table(JsonCodec("trivia_bags", "channel_id"))
+trivia_state = store.table(JsonCodec("trivia_rounds", "channel_id"))
+trivia_scores = store.table(
+    NestedCodec(
+        "trivia_scores", "guild_id", "user_id", ("score",),
+        encode=lambda score: (score,),
+        decode=lambda row: row[0],
+        container=Leaderboard,
+    )
+)
+
+
+def _guild_leaderboard(guild_id: int) -> Leaderboard:
+    board = trivia_scores.get(guild_id)
+    if board is None:
+        board = trivia_scores[guild_id] = Leaderboard()
+    return board
+
+
+# 所有頻道的限時題共用一個時間輪，由 trivia_tick 每秒推進一次
+trivia_wheel = TimerWheel(tick=1.0)
+channels = ChannelCache(core.bot)  # 揭曉答案時找頻道用
+
+
+def _close_round(channel_id: int) -> str | None:
+    current = trivia_state.get(channel_id)
+    if not current:
+        return None
+    trivia_state.pop(channel_id, None)
+    correct = current["answer"]
+    # 同一個 tick 內收到的正確答案依 interaction ID（snowflake，依送達時間遞增）決定先後
+    candidates = sorted(current.get("correct", []))
+    if not candidates:
+        return f"時間到！題目「{current['question']}」沒有人答對，正解是 {correct}。"
+    _, winner = candidates[0]
+    guild_id = current.get("guild_id", 0)
+    _guild_leaderboard(guild_id).increment(winner)
+    trivia_scores.touch(guild_id, winner)
+    extra = f"（另有 {len(candidates) - 1} 人也答對）" if len(candidates) > 1 else ""
+    return f"<@{winner}> 最先答對！+1 分。正解是 {correct}。{extra}"
+
+
+def _restore_trivia_rounds():
+    # 重啟後把還沒揭曉的題目排回時間輪；已過期的會在下一個 tick 揭曉（叢集模式下只管自己分片的伺服器）
+    trivia_state.preload(where=lambda _, current: owns_guild(current.get("guild_id", 0)))
+    for channel_id, current in list(trivia_state.items()):
+        deadline = time.time() if current.get("correct") else current.get("deadline", 0)
+        trivia_wheel.schedule(channel_id, deadline)
+
+
+@tasks.loop(seconds=1)
+async def trivia_tick():
+    expired = trivia_wheel.advance(time.time())
+    if not expired:
+        return
+
+    async def reveal(channel_id: int):
+        text = _close_round(channel_id)
+        if not text:
+            return
+        try:
+            channel = await channels.resolve(channel_id)
+            if channel is not None:
+                await channel.send(text)
+        except Exception as exc:
+            print(f"問答揭曉發送錯誤 ({channel_id}): {exc}")
+
+    await asyncio.gather(*(reveal(channel_id) for channel_id in expired))
+
+
+class TriviaGroup(app_commands.Group):
+    def __init__(self):
+        super().__init__(name="trivia", description="知識問答（輕鬆版）")
+
+    @app_commands.command(name="ask", description="出一題")
+    @app_commands.describe(category="題目類別（可留空）", difficulty="難度（可留空）")
+    @app_commands.choices(
+        difficulty=[
+            app_commands.Choice(name="easy", value="easy"),
+            app_commands.Choice(name="medium", value="medium"),
+            app_commands.Choice(name="hard", value="hard"),
+        ]
+    )
+    async def ask(
+        self,
+        interaction: discord.Interaction,
+        category: str | None = None,
+        difficulty: app_commands.Choice[str] | None = None,
+    ):
+        current = trivia_state.get(interaction.channel_id)
+        if current:
+            await interaction.response.send_message(
+                f"這個頻道還有題目進行中，<t:{int(current.get('deadline', time.time()))}:R> 揭曉。", ephemeral=True
+            )
+            return
+        # 每個頻道一個不重複的抽題袋，只存 seed 與進度
+        drawn = trivia_bag.draw(
+            trivia_bags.get(interaction.channel_id),
+            category,
+            difficulty.value if difficulty else None,
+        )
+        if drawn is None:
+            await interaction.response.send_message("找不到符合條件的題目。", ephemeral=True)
+            return
+        picked, bag_state = drawn
+        trivia_bags[interaction.channel_id] = bag_state
+        deadline = time.time() + TRIVIA_ROUND_SECONDS
+        trivia_state[interaction.channel_id] = {
+            **picked,
+            "guild_id": interaction.guild_id or 0,
+            "deadline": deadline,
+            "answered": [],
+            "correct": [],
+        }
+        trivia_wheel.schedule(interaction.channel_id, deadline)
+        choices_text = "\n".join(f"{label}. {text}" for label, text in zip(LABELS, picked["choices"]))
+        await interaction.response.send_message(
+            f"題目：{picked['question']}\n{choices_text}\n"
+            f"用 `/trivia answer` 回答，<t:{int(deadline)}:R> 截止，最先答對的人得分。"
+        )
+
+    @ask.autocomplete("category")
+    async def ask_category(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=name, value=name)
+            for name in trivia_bank.categories()
+            if current.lower() in name.lower()
+        ][:25]
+
+    @app_commands.command(name="answer", description="回答目前題目")
+    @app_commands.choices(
+        choice=[
+            app_commands.Choice(name="A", value="A"),
+            app_commands.Choice(name="B", value="B"),
+            app_commands.Choice(name="C", value="C"),
+            app_commands.Choice(name="D", value="D"),
+        ]
+    )
+    async def answer(self, interaction: discord.Interaction, choice: app_commands.Choice[str]):
+        current = trivia_state.get(interaction.channel_id)
+        if not current:
+            await interaction.response.send_message("目前沒有題目，先用 `/trivia ask` 出題。", ephemeral=True)
+            return
+
+        answered = current.setdefault("answered", [])
+        if interaction.user.id in answered:
+            await interaction.response.send_message("這題你已經作答過了。", ephemeral=True)
+            return
+        answered.append(interaction.user.id)
+        if choice.value == current["answer"]:
+            correct = current.setdefault("correct", [])
+            correct.append([interaction.id, interaction.user.id])
+            if len(correct) == 1:
+                # 第一個正確答案：下一個 tick 揭曉，期間同時送達的答案一起比先後
+                trivia_wheel.schedule(interaction.channel_id, time.time())
+            reply = "答案已送出，馬上揭曉！"
+        else:
+            reply = "可惜答錯了，等待揭曉正解。"
+        trivia_state.touch(interaction.channel_id)
+        await interaction.response.send_message(reply, ephemeral=True)
+
+    @app_commands.command(name="score", description="查看本伺服器排行榜（前 10）")
+    async def score(self, interaction: discord.Interaction):
+        board = trivia_scores.get(interaction.guild_id or 0)
+        if not board:
+            await interaction.response.send_message("目前沒有分數紀錄，先玩幾題吧。")
+            return
+        lines = [f"{rank}. <@{user_id}>：{score} 分" for rank, user_id, score in board.top(10)]
+        await interaction.response.send_message("排行榜（前 10）：\n" + "\n".join(lines))
+
+    @app_commands.command(name="rank", description="查看自己（或指定成員）在本伺服器的名次")
+    @app_commands.describe(member="要查詢的成員，預設是自己")
+    async def rank(self, interaction: discord.Interaction, member: discord.Member | None = None):
+        user = member or interaction.user
+        board = trivia_scores.get(interaction.guild_id or 0)
+        rank = board.rank(user.id) if board else None
+        if rank is None:
+            await interaction.response.send_message(f"<@{user.id}> 還沒有得分紀錄。", ephemeral=True)
+            return
+        await interaction.response.send_message(
+            f"<@{user.id}> 目前第 {rank} 名（{board[user.id]} 分，共 {len(board)} 人上榜）。",
+            ephemeral=True,
+        )
+
+
+async def setup(bot: commands.Bot):
+    global trivia_bank, trivia_bag
+    # 重新載入失敗時會對這個（已 teardown 的）模組再跑一次 setup：表格接回去、題庫重新打開
+    store.attach(trivia_bags, trivia_state, trivia_scores)
+    if isinstance(trivia_bank, MmapBank) and trivia_bank.closed:
+        trivia_bank = MmapBank(trivia_bank.path)
+        trivia_bag = ShuffleBag(trivia_bank)
+    _restore_trivia_rounds()
+    trivia_tick.start()
+    bot.tree.add_command(TriviaGroup())
+
+
+async def teardown(bot: commands.Bot):
+    await core.stop_loops(trivia_tick)
+    await store.release(trivia_bags, trivia_state, trivia_scores)
+    if isinstance(trivia_bank, MmapBank):
+        trivia_bank.close()
@@ -0,0 +1,307 @@
+"""
+yt-dlp 擷取：把 /play 的查詢轉成可直接交給 FFmpeg 的串流資訊。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from urllib.parse import parse_qs, urlsplit
+
+from .metrics import EXTRACT_SECONDS
+
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+YDL_OPTS = {
+    # 優先選 Opus 音訊，播放時可直接 remux，不必重新編碼
+    "format": "bestaudio[acodec=opus]/bestaudio/best",
+    "quiet": True,
+    "noplaylist": True,
+}
+
+
+@dataclass(frozen=True)
+class ExtractedTrack:
+    stream_url: str
+    title: str
+    video_id: str | None = None
+    webpage_url: str | None = None
+    acodec: str | None = None
+    abr: float | None = None
+    asr: int | None = None
+    duration: float | None = None
+    expires_at: float | None = None  # UNIX 秒，取自串流網址的 expire 參數
+
+
+def youtube_video_id(url: str) -> str | None:
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    candidate = None
+    if host == "youtu.be":
+        candidate = parts.path.lstrip("/").split("/")[0]
+    elif host.endswith("youtube.com"):
+        if parts.path == "/watch":
+            candidate = (parse_qs(parts.query).get("v") or [None])[0]
+        elif parts.path.startswith(("/shorts/", "/live/", "/embed/")):
+            candidate = parts.path.split("/")[2]
+    return candidate if candidate and _VIDEO_ID.match(candidate) else None
+
+
+def normalize_query(query: str) -> str:
+    """快取用的 key：YouTube 連結統一成影片 ID，關鍵字忽略大小寫與多餘空白。"""
+    query = query.strip()
+    if query.startswith("http"):
+        video_id = youtube_video_id(query)
+        return f"yt:{video_id}" if video_id else f"url:{query}"
+    return "search:" + " ".join(query.casefold().split())
+
+
+def stream_expiry(stream_url: str) -> float | None:
+    values = parse_qs(urlsplit(stream_url).query).get("expire")
+    try:
+        return float(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+def track_from_info(info: dict) -> ExtractedTrack:
+    # ytsearch 回傳會包在 entries
+    if "entries" in info:
+        info = info["entries"][0]
+    stream_url = info["url"]
+    return ExtractedTrack(
+        stream_url=stream_url,
+        title=info.get("title", "音樂"),
+        video_id=info.get("id") if info.get("extractor_key") == "Youtube" else youtube_video_id(info.get("webpage_url") or ""),
+        webpage_url=info.get("webpage_url"),
+        acodec=info.get("acodec"),
+        abr=info.get("abr"),
+        asr=info.get("asr"),
+        duration=info.get("duration"),
+        expires_at=stream_expiry(stream_url),
+    )
+
+
+def extract_track(query: str, ydl_opts: dict) -> ExtractedTrack:
+    """阻塞呼叫，請放到 executor 執行。"""
+    from yt_dlp import YoutubeDL  # 很重，第一次擷取時才載入
+
+    with YoutubeDL(ydl_opts) as ydl:
+        target = query if query.startswith("http") else f"ytsearch1:{query}"
+        return track_from_info(ydl.extract_info(target, download=False))
+
+
+def track_ttl(track: ExtractedTrack, margin: float = 300, default: float = 1800, maximum: float = 6 * 3600) -> float:
+    """依串流網址內的到期時間決定快取多久；提早 margin 秒過期，避免播到一半失效。"""
+    if track.expires_at is None:
+        return default
+    return max(0.0, min(maximum, track.expires_at - time.time() - margin))
+
+
+# ----------------------------
+# 擷取 worker pool
+# ----------------------------
+
+
+class ExtractorBusy(Exception):
+    """擷取佇列已滿（全域或單一伺服器）。"""
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def _worker_main(conn, ydl_opts: dict):
+    # 子行程：整個生命週期共用同一個 YoutubeDL，省去每次初始化的成本
+    from yt_dlp import YoutubeDL
+
+    ydl = YoutubeDL(ydl_opts)
+    while True:
+        try:
+            query = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if query is None:
+            break
+        try:
+            target = query if query.startswith("http") else f"ytsearch1:{query}"
+            conn.send(("ok", track_from_info(ydl.extract_info(target, download=False))))
+        except Exception as exc:
+            conn.send(("error", f"{type(exc).__name__}: {exc}"))
+
+
+class _Slot:
+    def __init__(self):
+        self.process: multiprocessing.process.BaseProcess | None = None
+        self.conn: Connection | None = None
+        self.jobs = 0
+
+
+class ExtractorPool:
+    """
+    yt-dlp 解析很吃 CPU，放在獨立行程裡跑，不和事件迴圈搶 GIL。
+    - 每個 worker 行程保留一個 YoutubeDL，處理 max_jobs 次後換新行程
+    - 佇列有全域與單一伺服器上限，滿了直接丟 ExtractorBusy（背壓）
+    - 各伺服器輪流取件，單一伺服器狂點 /play 不會餓死其他伺服器
+    - 單次擷取超過 timeout 秒就砍掉 worker 重開
+    - 第一次 extract() 時才開 worker 行程（yt_dlp 也是那時才載入），Bot 啟動不受影響
+    """
+
+    def __init__(
+        self,
+        ydl_opts: dict,
+        workers: int = 2,
+        max_queue: int = 64,
+        per_guild: int = 4,
+        timeout: float = 45,
+        max_jobs: int = 200,
+    ):
+        self.ydl_opts = ydl_opts
+        self.workers = workers
+        self.max_queue = max_queue
+        self.per_guild = per_guild
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues: dict[int, deque[tuple[str, asyncio.Future]]] = {}
+        self._ring: deque[int] = deque()
+        self._queued = 0
+        self._available: asyncio.Semaphore | None = None
+        self._slots = [_Slot() for _ in range(workers)]
+        self._io: ThreadPoolExecutor | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    async def start(self):
+        async with self._start_lock:
+            if self._tasks:
+                return
+            self._io = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="extractor-io")
+            loop = asyncio.get_running_loop()
+            for slot in self._slots:
+                await loop.run_in_executor(self._io, self._spawn, slot)
+            self._available = asyncio.Semaphore(0)
+            self._tasks = [asyncio.create_task(self._run(slot)) for slot in self._slots]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for slot in self._slots:
+            self._stop(slot)
+        for queue in self._queues.values():
+            for _, future in queue:
+                if not future.done():
+                    future.cancel()
+        self._queues.clear()
+        self._ring.clear()
+        self._queued = 0
+        if self._io is not None:
+            self._io.shutdown(wait=False)
+            self._io = None
+
+    async def extract(self, guild_id: int, query: str) -> ExtractedTrack:
+        if not self._tasks:
+            await self.start()
+        queue = self._queues.get(guild_id)
+        if self._queued >= self.max_queue or (queue is not None and len(queue) >= self.per_guild):
+            raise ExtractorBusy()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._queues[guild_id] = deque()
+            self._ring.append(guild_id)
+        queue.append((query, future))
+        self._queued += 1
+        self._available.release()
+        return await future
+
+    def _next_job(self) -> tuple[str, asyncio.Future] | None:
+        while self._ring:
+            guild_id = self._ring.popleft()
+            queue = self._queues[guild_id]
+            query, future = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._ring.append(guild_id)
+            else:
+                del self._queues[guild_id]
+            if not future.done():  # 呼叫端已放棄的工作直接略過
+                return query, future
+        return None
+
+    async def _run(self, slot: _Slot):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._available.acquire()
+            job = self._next_job()
+            if job is None:
+                continue
+            query, future = job
+            started = time.perf_counter()
+            try:
+                status, payload = await loop.run_in_executor(self._io, self._call, slot, query)
+            except Exception as exc:
+                EXTRACT_SECONDS.observe(time.perf_counter() - started, "timeout")
+                # 逾時或 worker 掛掉：換一個新的行程
+                await loop.run_in_executor(self._io, self._respawn, slot)
+                if not future.done():
+                    future.set_exception(ExtractionError(f"擷取逾時或失敗：{exc}"))
+                continue
+            EXTRACT_SECONDS.observe(time.perf_counter() - started, status)
+            if not future.done():
+                if status == "ok":
+                    future.set_result(payload)
+                else:
+                    future.set_exception(ExtractionError(payload))
+            slot.jobs += 1
+            if slot.jobs >= self.max_jobs:
+                await loop.run_in_executor(self._io, self._respawn, slot)
+
+    # 以下在 io 執行緒中執行
+
+    def _spawn(self, slot: _Slot):
+        parent, child = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child, self.ydl_opts), daemon=True)
+        process.start()
+        child.close()
+        slot.process, slot.conn, slot.jobs = process, parent, 0
+
+    def _stop(self, slot: _Slot):
+        if slot.conn is not None:
+            try:
+                slot.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            slot.conn.close()
+        if slot.process is not None:
+            slot.process.join(timeout=2)
+            if slot.process.is_alive():
+                slot.process.kill()
+                slot.process.join(timeout=2)
+        slot.process = slot.conn = None
+
+    def _respawn(self, slot: _Slot):
+        if slot.process is not None and slot.process.is_alive():
+            slot.process.kill()
+            slot.process.join(timeout=2)
+        if slot.conn is not None:
+            slot.conn.close()
+        slot.process = slot.conn = None
+        self._spawn(slot)
+
+    def _call(self, slot: _Slot, query: str) -> tuple[str, object]:
+        slot.conn.send(query)
+        if not slot.conn.poll(self.timeout):
+            raise TimeoutError(f"超過 {self.timeout:g} 秒")
+        return slot.conn.recv()
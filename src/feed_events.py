@@ -0,0 +1,94 @@
+"""
+叢集模式下 worker 之間傳遞 YouTube feed 結果的事件表（和狀態共用同一個 SQLite 檔）。
+
+負責輪詢某個頻道的 worker 寫入完整的 feed 快照；每個 worker 讀取新事件，
+只推播給自己分片上的伺服器，重複與否由各伺服器保存的 last_video 判斷。
+entries 為 NULL 的事件是「請立刻輪詢」的通知（WebSub 收到推送時轉給負責的 worker）。
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+
+from .feeds import FeedEntry
+from .storage import StateStore
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS feed_events ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, channel_id TEXT NOT NULL, created REAL NOT NULL, entries TEXT)"
+)
+_LATEST_SNAPSHOTS = "SELECT MAX(id) FROM feed_events WHERE entries IS NOT NULL GROUP BY channel_id"
+
+
+class FeedEventLog:
+    def __init__(self, store: StateStore, retention: float = 86400):
+        self._store = store
+        self.retention = retention
+        self._cursor: int | None = None  # 已讀到的最大事件 ID
+        self._ready = False
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = self._store.reader
+        if not self._ready:
+            with conn:
+                conn.execute(SCHEMA)
+            self._ready = True
+        return conn
+
+    async def _insert(self, channel_id: str, payload: str | None):
+        self._conn  # 確保資料表已建立
+        await self._store.execute(
+            lambda conn: conn.execute(
+                "INSERT INTO feed_events (channel_id, created, entries) VALUES (?, ?, ?)",
+                (channel_id, time.time(), payload),
+            )
+        )
+
+    async def publish(self, channel_id: str, entries: list[FeedEntry]):
+        """寫入一份 feed 快照（新 -> 舊）。"""
+        payload = json.dumps([[e.video_id, e.title, e.published] for e in entries], ensure_ascii=False)
+        await self._insert(channel_id, payload)
+
+    async def poke(self, channel_id: str):
+        await self._insert(channel_id, None)
+
+    def read_new(self) -> tuple[dict[str, list[FeedEntry]], set[str]]:
+        """
+        回傳上次讀取之後的快照（每個頻道只留最新一份）與被要求立刻輪詢的頻道。
+        第一次呼叫時從每個頻道目前最新的快照開始，補上停機期間錯過的新片。
+        """
+        conn = self._conn
+        if self._cursor is None:
+            self._cursor = conn.execute("SELECT COALESCE(MAX(id), 0) FROM feed_events").fetchone()[0]
+            rows = conn.execute(
+                f"SELECT id, channel_id, entries FROM feed_events WHERE id <= ? AND id IN ({_LATEST_SNAPSHOTS}) ORDER BY id",
+                (self._cursor,),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT id, channel_id, entries FROM feed_events WHERE id > ? ORDER BY id", (self._cursor,)
+            ).fetchall()
+        snapshots: dict[str, list[FeedEntry]] = {}
+        pokes: set[str] = set()
+        for event_id, channel_id, payload in rows:
+            self._cursor = max(self._cursor, event_id)
+            if payload is None:
+                pokes.add(channel_id)
+            else:
+                snapshots[channel_id] = [
+                    FeedEntry(video_id, title, published, channel_id) for video_id, title, published in json.loads(payload)
+                ]
+        return snapshots, pokes
+
+    async def prune(self) -> int:
+        """刪除超過保存期限的事件，但每個頻道保留最新的一份快照（給重啟的 worker 補推）。"""
+        self._conn
+        cutoff = time.time() - self.retention
+        return await self._store.execute(
+            lambda conn: conn.execute(
+                f"DELETE FROM feed_events WHERE created < ? AND id NOT IN ({_LATEST_SNAPSHOTS})", (cutoff,)
+            ).rowcount
+        )
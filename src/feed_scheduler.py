@@ -0,0 +1,160 @@
+"""
+YouTube feed 的自適應輪詢排程：每個頻道各自的下次檢查時間放在 heap 裡。
+"""
+
+from __future__ import annotations
+
+import heapq
+import random
+import statistics
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from .feeds import FeedEntry
+
+
+@dataclass
+class ChannelSchedule:
+    next_due: float
+    interval: float
+    cadence: float | None = None  # 推估的上片間隔（秒）
+    last_upload: float | None = None
+    latest_video: str | None = None
+    quiet_polls: int = 0
+    failures: int = 0
+    push_active: bool = False  # 有 WebSub 租約時輪詢只當備援
+
+
+class FeedScheduler:
+    """
+    - 依 feed 時間戳推估上片頻率，忙的頻道檢查得比較勤；一般頻道最多間隔 default_interval
+    - 只有太久沒上片或一直失敗的頻道會指數退避到 default_interval 以上
+    - 全域每分鐘請求額度（token bucket），超出的留到下一輪
+    - 有推送租約的頻道至少間隔 push_fallback_interval 才輪詢一次
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 60,
+        max_interval: float = 6 * 3600,
+        default_interval: float = 300,
+        requests_per_minute: int = 120,
+        push_fallback_interval: float = 3600,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.requests_per_minute = requests_per_minute
+        self.push_fallback_interval = push_fallback_interval
+        self._heap: list[tuple[float, str]] = []
+        self._channels: dict[str, ChannelSchedule] = {}
+        self._tokens = float(requests_per_minute)
+        self._refilled_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def get(self, channel_id: str) -> ChannelSchedule | None:
+        return self._channels.get(channel_id)
+
+    def sync(self, channel_ids: Iterable[str], now: float):
+        """新頻道立即排入，已無人追蹤的頻道移除（heap 裡的舊項目延後丟棄）。"""
+        wanted = set(channel_ids)
+        for channel_id in list(self._channels):
+            if channel_id not in wanted:
+                del self._channels[channel_id]
+        for channel_id in wanted:
+            if channel_id not in self._channels:
+                self._channels[channel_id] = ChannelSchedule(next_due=now, interval=self.default_interval)
+                heapq.heappush(self._heap, (now, channel_id))
+
+    def set_push_active(self, channel_id: str, active: bool):
+        sched = self._channels.get(channel_id)
+        if sched is not None:
+            sched.push_active = active
+
+    def poll_soon(self, channel_id: str, now: float, delay: float = 0.0):
+        """提前到 delay 秒後檢查（WebSub 推送的通知、推播失敗後重抓）；原本就更早到期則不變。"""
+        sched = self._channels.get(channel_id)
+        when = now + delay
+        if sched is None or sched.next_due <= when:
+            return
+        sched.next_due = when
+        heapq.heappush(self._heap, (when, channel_id))
+
+    def note_entries(self, channel_id: str, entries: list[FeedEntry]):
+        """推送進來的新片：更新最新影片與上片時間，不影響排程。"""
+        sched = self._channels.get(channel_id)
+        if sched is None or not entries:
+            return
+        newest = max(entries, key=lambda e: e.published or 0)
+        if newest.published is not None and (sched.last_upload is None or newest.published > sched.last_upload):
+            sched.last_upload = newest.published
+            sched.latest_video = newest.video_id
+            sched.quiet_polls = 0
+
+    def _refill(self, now: float):
+        if self._refilled_at is not None:
+            elapsed = max(0.0, now - self._refilled_at)
+            self._tokens = min(float(self.requests_per_minute), self._tokens + elapsed * self.requests_per_minute / 60)
+        self._refilled_at = now
+
+    def pop_due(self, now: float) -> list[str]:
+        self._refill(now)
+        due: list[str] = []
+        while self._heap and self._heap[0][0] <= now and self._tokens >= 1:
+            when, channel_id = heapq.heappop(self._heap)
+            sched = self._channels.get(channel_id)
+            if sched is None or sched.next_due != when:
+                continue  # 已移除或已重新排程的舊項目
+            self._tokens -= 1
+            due.append(channel_id)
+        return due
+
+    def _reschedule(self, channel_id: str, sched: ChannelSchedule, interval: float, now: float):
+        if sched.push_active:
+            interval = max(interval, self.push_fallback_interval)
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        sched.interval = interval
+        # 加一點抖動，避免大量頻道擠在同一秒
+        sched.next_due = now + interval * random.uniform(0.9, 1.1)
+        heapq.heappush(self._heap, (sched.next_due, channel_id))
+
+    def _base_interval(self, sched: ChannelSchedule) -> float:
+        # 預期一個上片間隔內檢查約 4 次；上片不勤的頻道也不能比 default_interval 慢，否則新片會晚好幾小時才推播
+        if sched.cadence:
+            return min(sched.cadence / 4, self.default_interval)
+        return self.default_interval
+
+    def record_success(self, channel_id: str, entries: list[FeedEntry], now: float):
+        """entries 為空代表 304 / 沒有內容。"""
+        sched = self._channels.get(channel_id)
+        if sched is None:
+            return
+        sched.failures = 0
+        if entries:
+            published = sorted((e.published for e in entries if e.published is not None), reverse=True)
+            gaps = [a - b for a, b in zip(published, published[1:]) if a > b]
+            if gaps:
+                observed = statistics.median(gaps)
+                sched.cadence = observed if sched.cadence is None else 0.7 * sched.cadence + 0.3 * observed
+            if published:
+                sched.last_upload = published[0]
+            if entries[0].video_id != sched.latest_video:
+                sched.quiet_polls = 0
+                sched.latest_video = entries[0].video_id
+
+        base = self._base_interval(sched)
+        interval = base
+        expected_gap = sched.cadence or self.default_interval * 4
+        if sched.last_upload is not None and now - sched.last_upload > 2 * expected_gap:
+            sched.quiet_polls += 1
+            interval = base * 2 ** min(sched.quiet_polls, 10)
+        self._reschedule(channel_id, sched, interval, now)
+
+    def record_failure(self, channel_id: str, now: float):
+        sched = self._channels.get(channel_id)
+        if sched is None:
+            return
+        sched.failures += 1
+        self._reschedule(channel_id, sched, self._base_interval(sched) * 2 ** min(sched.failures, 10), now)
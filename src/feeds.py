@@ -0,0 +1,156 @@
+"""
+YouTube 頻道 Atom feed 用戶端：條件式請求 + 串流解析。
+"""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+from collections.abc import Collection
+from dataclasses import dataclass
+from datetime import datetime
+
+import aiohttp
+
+FEED_URL = "https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_YT = "{http://www.youtube.com/xml/schemas/2015}"
+
+
+@dataclass(frozen=True)
+class FeedEntry:
+    video_id: str
+    title: str
+    published: float | None  # UNIX 秒
+    channel_id: str | None = None
+
+
+@dataclass
+class FeedResult:
+    entries: list[FeedEntry]  # feed 原本的順序：新 -> 舊
+    not_modified: bool = False
+
+
+def _parse_timestamp(text: str | None) -> float | None:
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
+
+
+def _entry_from_element(elem: ET.Element) -> FeedEntry | None:
+    video_id = elem.findtext(f"{_YT}videoId")
+    if not video_id:
+        return None
+    return FeedEntry(
+        video_id=video_id,
+        title=elem.findtext(f"{_ATOM}title") or "",
+        published=_parse_timestamp(elem.findtext(f"{_ATOM}published")),
+        channel_id=elem.findtext(f"{_YT}channelId"),
+    )
+
+
+def parse_feed(data: bytes | str) -> list[FeedEntry]:
+    """一次解析整份 Atom（例如 WebSub 推送的內容），格式錯誤時回傳空清單。"""
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError:
+        return []
+    entries = []
+    for elem in root.iter(f"{_ATOM}entry"):
+        entry = _entry_from_element(elem)
+        if entry is not None:
+            entries.append(entry)
+    return entries
+
+
+def new_entries_since(entries: list[FeedEntry], last_video: str | None, partial: bool = False) -> list[FeedEntry]:
+    """
+    回傳比 last_video 新的影片（舊 -> 新）。沒有紀錄，或 last_video 已不在 feed 裡
+    （被刪除、或新片多到擠出 feed）時只算最新一部，避免把整份 feed 重推一次。
+    partial 表示 entries 本來就只有新片（WebSub 推送），找不到 last_video 時全部都算。
+    """
+    if not entries:
+        return []
+    if not last_video:
+        return entries[:1]
+    fresh: list[FeedEntry] = []
+    for entry in entries:
+        if entry.video_id == last_video:
+            break
+        fresh.append(entry)
+    else:
+        if not partial:
+            return entries[:1]
+    fresh.reverse()
+    return fresh
+
+
+class FeedClient:
+    """記住每個頻道的 ETag / Last-Modified，沒變動的 feed 只花一個 304。"""
+
+    def __init__(self, chunk_size: int = 8192):
+        self.chunk_size = chunk_size
+        self._validators: dict[str, tuple[str | None, str | None]] = {}
+
+    def forget(self, channel_id: str):
+        self._validators.pop(channel_id, None)
+
+    async def fetch(
+        self,
+        session: aiohttp.ClientSession,
+        channel_id: str,
+        stop_at: Collection[str] = (),
+        limit: int | None = None,
+        conditional: bool = True,
+    ) -> FeedResult | None:
+        """
+        抓取並逐段解析 feed。讀到 stop_at 裡所有影片 ID（或 limit 筆）就停止，
+        不再下載剩下的內容。失敗時回傳 None。
+        """
+        headers: dict[str, str] = {}
+        if conditional:
+            etag, last_modified = self._validators.get(channel_id, (None, None))
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        remaining = set(stop_at)
+        entries: list[FeedEntry] = []
+        async with session.get(FEED_URL.format(channel_id=channel_id), headers=headers) as resp:
+            if resp.status == 304:
+                return FeedResult(entries=[], not_modified=True)
+            if resp.status >= 400:
+                return None
+
+            parser = ET.XMLPullParser(events=("end",))
+            done = False
+            try:
+                async for chunk in resp.content.iter_chunked(self.chunk_size):
+                    parser.feed(chunk)
+                    for _, elem in parser.read_events():
+                        if elem.tag != f"{_ATOM}entry":
+                            continue
+                        entry = _entry_from_element(elem)
+                        elem.clear()
+                        if entry is None:
+                            continue
+                        entries.append(entry)
+                        remaining.discard(entry.video_id)
+                        if (stop_at and not remaining) or (limit is not None and len(entries) >= limit):
+                            done = True
+                            break
+                    if done:
+                        break
+                if not done:
+                    parser.close()
+            except ET.ParseError:
+                return None
+
+            # 一次性的查詢（例如 /autofeed add）不能蓋掉輪詢用的驗證值，否則下一輪會拿到 304 而漏掉新片
+            if conditional:
+                self._validators[channel_id] = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+        return FeedResult(entries=entries)
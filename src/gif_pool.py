@@ -0,0 +1,122 @@
+"""
+備用貓咪 GIF 的預熱池：背景先把隨機 GIF 解析成固定網址，/gif 直接取用，不必在互動中連外。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import secrets
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+from yarl import URL
+
+CATAAS_GIF_URL = "https://cataas.com/cat/gif"
+CATAAS_BASE = "https://cataas.com"
+
+
+class CataasResolver:
+    """
+    把「隨機 GIF」解析成單張圖的固定網址，不下載圖片本身：
+    先試 HEAD 不跟隨轉址（有 Location 就用），服務沒有轉址時改問 ?json=true 的中繼資料。
+    """
+
+    def __init__(self, get_session: Callable[[], Awaitable[aiohttp.ClientSession]]):
+        self.get_session = get_session
+        self._head_redirects = True  # 發現不會轉址後就不再浪費一次 HEAD
+
+    async def __call__(self) -> str | None:
+        session = await self.get_session()
+        if self._head_redirects:
+            async with session.head(CATAAS_GIF_URL, allow_redirects=False) as resp:
+                location = resp.headers.get("Location")
+                if 300 <= resp.status < 400 and location:
+                    return str(resp.url.join(URL(location)))
+                if resp.status < 400:
+                    self._head_redirects = False
+        async with session.get(CATAAS_GIF_URL, params={"json": "true"}) as resp:
+            if resp.status >= 400:
+                return None
+            meta = await resp.json(content_type=None)
+        cat_id = meta.get("id") or meta.get("_id")
+        if cat_id:
+            return f"{CATAAS_BASE}/cat/{cat_id}"
+        url = meta.get("url")
+        if url:
+            return url if url.startswith("http") else CATAAS_BASE + url
+        return None
+
+
+def fallback_url() -> str:
+    """池子空了時使用：不連外，加上隨機參數讓 Discord 不會沿用上一張的預覽。"""
+    return f"{CATAAS_GIF_URL}?_={secrets.token_hex(4)}"
+
+
+class UrlPool:
+    """
+    - take() 為 O(1)，只從已解析好的網址取，不碰網路
+    - 背景每 refill_interval 秒補一個，補滿 size 個就停下來等人取用
+    - 連續失敗時退避，最長 max_backoff 秒
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[], Awaitable[str | None]],
+        size: int = 8,
+        refill_interval: float = 1.0,
+        max_backoff: float = 300,
+    ):
+        self.resolve = resolve
+        self.size = size
+        self.refill_interval = refill_interval
+        self.max_backoff = max_backoff
+        self._urls: deque[str] = deque()
+        self._wanted = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.taken = 0
+        self.empty = 0
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def start(self):
+        if self._task is None:
+            self._wanted.set()
+            self._task = asyncio.create_task(self._refill())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def take(self) -> str | None:
+        self._wanted.set()
+        if not self._urls:
+            self.empty += 1
+            return None
+        self.taken += 1
+        return self._urls.popleft()
+
+    async def _refill(self):
+        failures = 0
+        while True:
+            if len(self._urls) >= self.size:
+                self._wanted.clear()
+                await self._wanted.wait()
+                continue
+            try:
+                url = await self.resolve()
+            except Exception as exc:
+                # 上游回傳格式不對等非預期錯誤也只退避，不能讓預熱工作整個停掉
+                url = None
+                print(f"備用 GIF 預熱失敗: {type(exc).__name__}: {exc}")
+            if url:
+                failures = 0
+                if url not in self._urls:
+                    self._urls.append(url)
+                await asyncio.sleep(self.refill_interval)
+            else:
+                failures += 1
+                await asyncio.sleep(min(self.max_backoff, self.refill_interval * 2 ** failures))
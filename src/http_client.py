@@ -0,0 +1,232 @@
+"""
+共用的 HTTP 客戶端：連線池、DNS 快取、分開的連線/讀取逾時、GET 重試，以及每個上游各自的斷路器。
+介面與 aiohttp.ClientSession 的 get / head / post 相同（async with 取得 response）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Any
+
+import aiohttp
+from yarl import URL
+
+from .metrics import HTTP_ERRORS, HTTP_SECONDS
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+
+
+class CircuitOpenError(aiohttp.ClientConnectionError):
+    """上游的斷路器開著：直接失敗，不佔用連線。"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} 暫時無法連線（{retry_in:.0f} 秒後再試）")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    - closed：正常放行，連續失敗 failure_threshold 次就 open
+    - open：reset_timeout 秒內一律拒絕
+    - half-open：時間到後只放一個試探請求，成功就 closed，失敗再 open
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probe_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.reset_timeout else "half-open"
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        now = time.monotonic()
+        # 試探請求被取消的話不會回報結果，超過 reset_timeout 就再放一個
+        if self._probe_at is not None and now - self._probe_at < self.reset_timeout:
+            return False
+        self._probe_at = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_at = None
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class _RequestContext:
+    def __init__(self, client: HttpClient, method: str, url: str, kwargs: dict[str, Any]):
+        self._client = client
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+        self._resp: aiohttp.ClientResponse | None = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        self._resp = await self._client._send(self._method, self._url, self._kwargs)
+        return self._resp
+
+    async def __aexit__(self, *exc_info):
+        if self._resp is not None:
+            self._resp.release()
+
+
+class HttpClient:
+    """
+    - 每個主機最多 limit_per_host 條連線，閒置連線保留 keepalive 秒重複使用
+    - DNS 結果快取 dns_ttl 秒
+    - connect_timeout 只管建立連線，read_timeout 是兩次收到資料之間的上限，total_timeout 為整體上限
+    - GET / HEAD 遇到連線錯誤、逾時或 429/5xx 時重試 retries 次（full jitter 指數退避，會參考 Retry-After）
+    - 斷路器以主機為單位（Tenor、cataas、YouTube 各自獨立）
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 16,
+        dns_ttl: float = 300,
+        keepalive: float = 30,
+        connect_timeout: float = 5,
+        read_timeout: float = 10,
+        total_timeout: float = 20,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 5,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout, sock_read=read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self._session: aiohttp.ClientSession | None = None
+        self.retried = 0
+        self.rejected = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def get(self, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self, "GET", url, kwargs)
+
+    def head(self, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self, "HEAD", url, kwargs)
+
+    def post(self, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self, "POST", url, kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> _RequestContext:
+        return _RequestContext(self, method.upper(), url, kwargs)
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def _delay(self, attempt: int, resp: aiohttp.ClientResponse | None = None) -> float:
+        if resp is not None:
+            try:
+                retry_after = float(resp.headers.get("Retry-After", ""))
+            except ValueError:
+                pass
+            else:
+                return min(self.max_backoff, max(0.0, retry_after))
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def _send(self, method: str, url: str, kwargs: dict[str, Any]) -> aiohttp.ClientResponse:
+        host = URL(url).host or ""
+        breaker = self.breaker(host)
+        attempts = 1 + (self.retries if method in IDEMPOTENT_METHODS else 0)
+        for attempt in range(attempts):
+            # 斷路器以「一個請求」計：重試不再占用半開時的試探名額，失敗也只在重試用完後記一次；
+            # 重試之間斷路器被其他請求打開就停手
+            allowed = breaker.allow() if attempt == 0 else breaker.state != "open"
+            if not allowed:
+                self.rejected += 1
+                HTTP_ERRORS.inc(host, "circuit_open")
+                raise CircuitOpenError(host, breaker.retry_in())
+            last = attempt + 1 >= attempts
+            started = time.perf_counter()
+            try:
+                resp = await self.session.request(method, url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                HTTP_SECONDS.observe(time.perf_counter() - started, host)
+                HTTP_ERRORS.inc(host, type(exc).__name__)
+                if last:
+                    breaker.record_failure()
+                    raise
+                self.retried += 1
+                await asyncio.sleep(self._delay(attempt))
+                continue
+            HTTP_SECONDS.observe(time.perf_counter() - started, host)
+            if resp.status >= 400:
+                HTTP_ERRORS.inc(host, str(resp.status))
+            if resp.status in RETRY_STATUSES:
+                if last:
+                    breaker.record_failure()
+                    return resp
+                delay = self._delay(attempt, resp)
+                resp.release()
+                self.retried += 1
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return resp
+        raise AssertionError("unreachable")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "breakers": {host: breaker.state for host, breaker in self.breakers.items()},
+        }
@@ -0,0 +1,80 @@
+"""
+問答排行榜：分數只會 +1，維持一個依分數由高到低排好的陣列，
+同分的玩家佔一段連續區間，記下每段的起點就能直接算名次。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+
+
+class Leaderboard(Mapping):
+    """
+    - increment：O(1)（和同分區段的第一個交換位置，區段起點後移）
+    - top(n)：O(n)
+    - rank：O(1)，同分同名次（1, 2, 2, 4 ...）
+    以 Mapping 的形式提供 user_id -> 分數，方便存檔。
+    """
+
+    def __init__(self, scores: Mapping[int, int] | None = None):
+        self._scores: dict[int, int] = {}
+        self._order: list[int] = []
+        self._pos: dict[int, int] = {}
+        self._start: dict[int, int] = {}  # 分數 -> 該分數區段在 _order 的起點
+        if scores:
+            self._order = sorted(scores, key=lambda user_id: scores[user_id], reverse=True)
+            for index, user_id in enumerate(self._order):
+                score = scores[user_id]
+                self._scores[user_id] = score
+                self._pos[user_id] = index
+                self._start.setdefault(score, index)
+
+    def __getitem__(self, user_id: int) -> int:
+        return self._scores[user_id]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._scores)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._scores
+
+    def increment(self, user_id: int) -> int:
+        if user_id not in self._scores:
+            self._scores[user_id] = 0
+            self._pos[user_id] = len(self._order)
+            self._start.setdefault(0, len(self._order))
+            self._order.append(user_id)
+
+        score = self._scores[user_id]
+        pos = self._pos[user_id]
+        first = self._start[score]
+        if pos != first:
+            other = self._order[first]
+            self._order[first], self._order[pos] = user_id, other
+            self._pos[user_id], self._pos[other] = first, pos
+
+        # user 移到原區段的最前面，原區段起點後移一格後，user 就落在 score + 1 區段的尾端
+        next_start = first + 1
+        if next_start < len(self._order) and self._scores[self._order[next_start]] == score:
+            self._start[score] = next_start
+        else:
+            del self._start[score]
+        self._start.setdefault(score + 1, first)
+        self._scores[user_id] = score + 1
+        return score + 1
+
+    def rank(self, user_id: int) -> int | None:
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._start[score] + 1
+
+    def top(self, n: int) -> list[tuple[int, int, int]]:
+        """回傳前 n 名的 (名次, user_id, 分數)。"""
+        return [
+            (self._start[self._scores[user_id]] + 1, user_id, self._scores[user_id])
+            for user_id in self._order[:n]
+        ]
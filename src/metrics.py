@@ -0,0 +1,213 @@
+"""
+程式內建的指標（Prometheus 文字格式）：指令延遲、上游 HTTP、yt-dlp 擷取、feed 輪詢與事件迴圈延遲。
+
+記錄只是在記憶體裡累加（一次 dict 查詢與二分搜尋），沒有人抓取時不做任何額外工作；
+設定 METRICS_PORT 後在本機開 /metrics 給 Prometheus 抓取。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+# 秒；涵蓋 Discord 的 3 秒回應期限前後
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+
+    def _labels(self, values: tuple, extra: tuple[tuple[str, str], ...] = ()) -> str:
+        pairs = [*zip(self.labelnames, values), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{self._labels(labels)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """目前的值；也可以給一個函式，抓取時才計算。"""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), function: Callable[[], float] | None = None):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+        self.function = function
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def samples(self):
+        if self.function is not None:
+            yield f"{self.name} {_format_value(self.function())}"
+            return
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{self._labels(labels)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """固定分桶；每組標籤存各桶的個數（非累計）與總和，輸出時才累加。"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # labels -> [各桶個數..., 超過最大桶的個數, 總和]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                yield f"{self.name}_bucket{self._labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._labels(labels)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{self._labels(labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"指標名稱重複：{metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = (), function: Callable[[], float] | None = None) -> Gauge:
+        return self._add(Gauge(name, help, labelnames, function))
+
+    def histogram(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    "bot_command_seconds",
+    "斜線指令的延遲：first_response 為第一次回應（defer 或直接回覆）完成，total 為處理函式結束",
+    ("command", "phase"),
+)
+COMMAND_ERRORS = REGISTRY.counter("bot_command_errors_total", "斜線指令失敗次數", ("command",))
+HTTP_SECONDS = REGISTRY.histogram("bot_http_request_seconds", "上游 HTTP 每次嘗試到收到回應標頭的時間", ("host",))
+HTTP_ERRORS = REGISTRY.counter(
+    "bot_http_errors_total", "上游 HTTP 錯誤（狀態碼、例外名稱或 circuit_open）", ("host", "kind")
+)
+EXTRACT_SECONDS = REGISTRY.histogram(
+    "bot_extract_seconds", "yt-dlp 擷取時間（子行程或執行緒實際執行，不含排隊）", ("outcome",), buckets=(0.5, 1, 2, 5, 10, 20, 45, 90)
+)
+PLAYBACK_ERRORS = REGISTRY.counter("bot_playback_errors_total", "播歌失敗次數", ("stage",))
+FEED_POLL_SECONDS = REGISTRY.histogram("bot_feed_poll_seconds", "一輪 feed 輪詢的耗時")
+FEED_POLL_FEEDS = REGISTRY.histogram(
+    "bot_feed_poll_feeds", "一輪輪詢檢查的 feed 數", buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+FEED_RESULTS = REGISTRY.counter("bot_feed_fetch_total", "feed 抓取結果（changed / not_modified / failed）", ("result",))
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "bot_event_loop_lag_seconds", "事件迴圈延遲（計時器比預定晚醒來的時間）", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+
+
+async def monitor_loop_lag(interval: float = 0.5):
+    """每 interval 秒睡一次，量測實際晚醒來多久；事件迴圈被卡住時這個值會變大。"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - started - interval))
+
+
+class MetricsServer:
+    """在本機開一個 /metrics 端點；只有被抓取時才產生文字。"""
+
+    def __init__(self, registry: Registry = REGISTRY):
+        self.registry = registry
+        self._runner: web.AppRunner | None = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        from aiohttp import web
+
+        response = web.Response(body=self.registry.render().encode())
+        response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+        return response
+
+    async def start(self, host: str, port: int):
+        # 擷取子行程也會匯入這個模組，伺服器相關的部分用到時才載入
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,227 @@
+"""
+每個伺服器一個播放器：歌曲佇列、預先準備下一首，以及閒置時自動離開語音頻道。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import discord
+
+from .extractor import ExtractedTrack
+from .metrics import PLAYBACK_ERRORS
+
+# 串流中途斷線時讓 FFmpeg 自己重連，不必整首重來
+FFMPEG_BEFORE_OPTIONS = "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5"
+OPUS_MAX_BITRATE = 510  # Opus 規格上限（kbps）
+
+
+def can_passthrough(track: ExtractedTrack) -> bool:
+    """來源已是 48 kHz 的 Opus：FFmpeg 只需重新封裝成 Ogg，不必解碼再編碼。"""
+    return (
+        (track.acodec or "").split(".")[0] == "opus"
+        and (track.asr is None or track.asr == 48000)
+        and (track.abr is None or track.abr <= OPUS_MAX_BITRATE)
+    )
+
+
+async def open_source(track: ExtractedTrack) -> discord.AudioSource:
+    kwargs = {"before_options": FFMPEG_BEFORE_OPTIONS, "options": "-vn"}
+    if can_passthrough(track):
+        return discord.FFmpegOpusAudio(track.stream_url, codec="copy", **kwargs)
+    if track.acodec and track.acodec != "none":
+        # yt-dlp 已經告訴我們編碼，不必再跑一次 ffprobe
+        bitrate = max(16, min(OPUS_MAX_BITRATE, round(track.abr or 128)))
+        return discord.FFmpegOpusAudio(track.stream_url, bitrate=bitrate, **kwargs)
+    return await discord.FFmpegOpusAudio.from_probe(track.stream_url, **kwargs)
+
+
+@dataclass
+class QueuedTrack:
+    query: str
+    track: ExtractedTrack
+    requester_id: int
+
+
+class QueueFull(Exception):
+    pass
+
+
+class GuildPlayer:
+    """
+    - 目前這首開始播放後，背景重新解析下一首（串流網址可能已過期）並先開好 FFmpeg，
+      after 回呼時直接接上，換歌幾乎沒有空檔
+    - 有長度資訊時等到剩 prefetch_lead 秒才開 FFmpeg，避免長時間佔著連線
+    - 佇列播完後 idle_timeout 秒內沒有新歌就離開語音頻道
+    """
+
+    def __init__(
+        self,
+        guild_id: int,
+        resolve: Callable[[str, int], Awaitable[ExtractedTrack]],
+        on_close: Callable[[int], None] | None = None,
+        open_source: Callable[[ExtractedTrack], Awaitable[discord.AudioSource]] = open_source,
+        max_queue: int = 50,
+        prefetch_lead: float = 30,
+        idle_timeout: float = 300,
+    ):
+        self.guild_id = guild_id
+        self.resolve = resolve
+        self.on_close = on_close
+        self.open_source = open_source
+        self.max_queue = max_queue
+        self.prefetch_lead = prefetch_lead
+        self.idle_timeout = idle_timeout
+        self.voice: discord.VoiceClient | None = None
+        self.queue: deque[QueuedTrack] = deque()
+        self.current: QueuedTrack | None = None
+        self.started_at: float | None = None
+        self._prepared: tuple[QueuedTrack, discord.AudioSource] | None = None
+        self._starting: asyncio.Task | None = None
+        self._prefetch: asyncio.Task | None = None
+        self._idle: asyncio.TimerHandle | None = None
+        self._closed = False
+
+    def elapsed(self) -> float:
+        return 0.0 if self.started_at is None else time.monotonic() - self.started_at
+
+    def enqueue(self, voice: discord.VoiceClient, item: QueuedTrack) -> int:
+        """加入佇列；回傳排在第幾首（0 表示馬上播放）。"""
+        if len(self.queue) >= self.max_queue:
+            raise QueueFull()
+        self.voice = voice
+        self._cancel_idle()
+        self.queue.append(item)
+        if self.current is None:
+            self._start_next()
+            return 0
+        self._ensure_prefetch()
+        return len(self.queue)
+
+    def skip(self) -> QueuedTrack | None:
+        skipped = self.current
+        if skipped is None:
+            return None
+        if self.voice is not None and (self.voice.is_playing() or self.voice.is_paused()):
+            self.voice.stop()  # 交給 after 回呼接下一首
+        else:
+            if self._starting is not None:
+                self._starting.cancel()
+            self._start_next()
+        return skipped
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._cancel_idle()
+        for task in (self._starting, self._prefetch):
+            if task is not None:
+                task.cancel()
+        self._drop_prepared()
+        self.queue.clear()
+        self.current = None
+        if self.voice is not None and self.voice.is_connected():
+            self.voice.stop()
+            await self.voice.disconnect()
+        if self.on_close:
+            self.on_close(self.guild_id)
+
+    # ----------------------------
+
+    def _start_next(self):
+        if self._closed:
+            return
+        if self._prefetch is not None:
+            self._prefetch.cancel()
+            self._prefetch = None
+        self.current = None
+        self.started_at = None
+        if not self.queue:
+            self._drop_prepared()
+            self._arm_idle()
+            return
+        item = self.queue.popleft()
+        source = None
+        if self._prepared is not None and self._prepared[0] is item:
+            source = self._prepared[1]
+            self._prepared = None
+        else:
+            self._drop_prepared()
+        self.current = item
+        self._starting = asyncio.create_task(self._play(item, source))
+
+    async def _play(self, item: QueuedTrack, source: discord.AudioSource | None):
+        try:
+            if source is None:
+                track = await self.resolve(item.query, self.guild_id)
+                source = await self.open_source(track)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            PLAYBACK_ERRORS.inc("start")
+            print(f"播放失敗 ({item.track.title}): {exc}")
+            self._start_next()
+            return
+        if self._closed or self.voice is None or not self.voice.is_connected() or self.current is not item:
+            source.cleanup()
+            if not self._closed and (self.voice is None or not self.voice.is_connected()):
+                await self.close()
+            return
+        self.started_at = time.monotonic()
+        self.voice.play(source, after=self._after)
+        self._ensure_prefetch()
+
+    def _after(self, error: Exception | None):
+        # 在語音執行緒中被呼叫
+        if error:
+            print(f"播放錯誤: {error}")
+            self.voice.loop.call_soon_threadsafe(PLAYBACK_ERRORS.inc, "playback")
+        self.voice.loop.call_soon_threadsafe(self._start_next)
+
+    def _ensure_prefetch(self):
+        if self.started_at is None or not self.queue or self._prepared is not None:
+            return
+        if self._prefetch is None or self._prefetch.done():
+            self._prefetch = asyncio.create_task(self._prefetch_next(self.current))
+
+    async def _prefetch_next(self, playing: QueuedTrack):
+        duration = playing.track.duration
+        if duration:
+            await asyncio.sleep(max(0.0, duration - self.prefetch_lead - self.elapsed()))
+        if not self.queue or self.current is not playing:
+            return
+        item = self.queue[0]
+        try:
+            track = await self.resolve(item.query, self.guild_id)
+            source = await self.open_source(track)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            PLAYBACK_ERRORS.inc("prefetch")
+            print(f"預先準備下一首失敗 ({item.track.title}): {exc}")
+            return  # 換歌時會再試一次
+        if self.current is playing and self.queue and self.queue[0] is item and self._prepared is None:
+            self._prepared = (item, source)
+        else:
+            source.cleanup()
+
+    def _drop_prepared(self):
+        if self._prepared is not None:
+            self._prepared[1].cleanup()  # 關掉預先開好的 FFmpeg
+            self._prepared = None
+
+    def _arm_idle(self):
+        self._cancel_idle()
+        self._idle = asyncio.get_running_loop().call_later(
+            self.idle_timeout, lambda: asyncio.create_task(self.close())
+        )
+
+    def _cancel_idle(self):
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
@@ -0,0 +1,291 @@
+"""
+文字 RPG 的規則與單一玩家的行動處理。
+數值都集中在 RULES，Bot 與平衡模擬器（tools/rpg_sim.py）共用同一份。
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Roll:
+    """randint(low, high + high_per_level * 等級) + per_level * 等級 + 等級 // level_div。"""
+
+    low: int
+    high: int
+    per_level: int = 0
+    high_per_level: int = 0
+    level_div: int = 0
+
+    def bonus(self, level: int) -> int:
+        return self.per_level * level + (level // self.level_div if self.level_div else 0)
+
+    def min(self, level: int) -> int:
+        return self.low + self.bonus(level)
+
+    def max(self, level: int) -> int:
+        return self.high + self.high_per_level * level + self.bonus(level)
+
+    def roll(self, level: int, rng: random.Random = random) -> int:
+        high = self.high + self.high_per_level * level
+        if high == self.low:
+            # 固定值不抽亂數，同一串亂數下的結果才和寫死數值時一樣
+            return self.low + self.bonus(level)
+        return rng.randint(self.low, high) + self.bonus(level)
+
+
+@dataclass(frozen=True)
+class RpgRules:
+    start_hp: int = 20
+    start_potions: int = 1
+    xp_to_next: Roll = Roll(8, 8, per_level=4)
+    level_up_max_hp: int = 2
+    level_up_potions: int = 1
+    rest_heal: Roll = Roll(8, 8, per_level=1)
+    potion_heal: int = 12
+    potion_price: int = 5
+    # 探索結果的機率（依序累加；剩下的機率是迷路撿到 lost_gold）
+    explore_monster: float = 0.55
+    explore_chest: float = 0.20
+    explore_campfire: float = 0.15
+    monster_names: tuple[str, ...] = ("史萊姆", "小狼", "哥布林", "骷髏兵", "野豬")
+    monster_hp: Roll = Roll(10, 14, per_level=3)
+    chest_gold: Roll = Roll(2, 6)
+    chest_xp: Roll = Roll(1, 4)
+    campfire_heal: Roll = Roll(6, 6, per_level=1)
+    lost_gold: int = 1
+    player_damage: Roll = Roll(3, 6, high_per_level=1)
+    monster_damage: Roll = Roll(1, 4, high_per_level=1)
+    kill_gold: Roll = Roll(4, 8, per_level=1)
+    kill_xp: Roll = Roll(3, 6, level_div=2)
+    death_gold_divisor: int = 2  # 倒下時損失 金幣 // death_gold_divisor
+    flee_penalty: Roll = Roll(0, 3)
+
+
+RULES = RpgRules()
+
+HELP_TEXT = (
+    "RPG 指令：\n"
+    "- /rpg explore：探索（可能遇到怪/寶箱/休息點）\n"
+    "- /rpg fight：戰鬥一回合（需要先探索遇到怪）\n"
+    "- /rpg flee：逃跑（可能掉少量金幣）\n"
+    "- /rpg rest：休息回血\n"
+    "- /rpg potion：喝藥水回血\n"
+    "- /rpg shop：花 {price} 金幣買 1 瓶藥水\n"
+    "- /rpg status：查看狀態"
+)
+
+
+class PlayerState:
+    """
+    一名玩家的狀態。用 __slots__ 而不是 dict：每人只有固定幾個欄位，百萬名玩家時省下大半記憶體。
+    遭遇戰直接攤平成 enemy / enemy_hp / enemy_max_hp 三個欄位（enemy 為 None 表示沒有遭遇戰）。
+    """
+
+    __slots__ = ("level", "xp", "gold", "max_hp", "hp", "potions", "enemy", "enemy_hp", "enemy_max_hp")
+
+    def __init__(
+        self,
+        level: int = 1,
+        xp: int = 0,
+        gold: int = 0,
+        max_hp: int = RULES.start_hp,
+        hp: int = RULES.start_hp,
+        potions: int = RULES.start_potions,
+        enemy: str | None = None,
+        enemy_hp: int = 0,
+        enemy_max_hp: int = 0,
+    ):
+        self.level = level
+        self.xp = xp
+        self.gold = gold
+        self.max_hp = max_hp
+        self.hp = hp
+        self.potions = potions
+        self.enemy = enemy
+        self.enemy_hp = enemy_hp
+        self.enemy_max_hp = enemy_max_hp
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"PlayerState({fields})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PlayerState):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def clear_encounter(self):
+        self.enemy = None
+        self.enemy_hp = 0
+        self.enemy_max_hp = 0
+
+    def to_dict(self) -> dict:
+        """資料庫中的 JSON 格式（與舊版 dict 狀態相同）。"""
+        encounter = None
+        if self.enemy is not None:
+            encounter = {"name": self.enemy, "hp": self.enemy_hp, "max_hp": self.enemy_max_hp}
+        return {
+            "level": self.level,
+            "xp": self.xp,
+            "gold": self.gold,
+            "max_hp": self.max_hp,
+            "hp": self.hp,
+            "potions": self.potions,
+            "encounter": encounter,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> PlayerState:
+        state = cls(data["level"], data["xp"], data["gold"], data["max_hp"], data["hp"], data["potions"])
+        encounter = data.get("encounter")
+        if encounter:
+            # 怪物名稱只有幾種，intern 後所有玩家共用同一個字串
+            state.enemy = sys.intern(encounter["name"])
+            state.enemy_hp = encounter["hp"]
+            state.enemy_max_hp = encounter["max_hp"]
+        return state
+
+
+def new_player(rules: RpgRules = RULES) -> PlayerState:
+    return PlayerState(max_hp=rules.start_hp, hp=rules.start_hp, potions=rules.start_potions)
+
+
+def xp_to_next(level: int, rules: RpgRules = RULES) -> int:
+    return rules.xp_to_next.min(level)
+
+
+def level_up_if_needed(state: PlayerState, rules: RpgRules = RULES) -> list[str]:
+    messages: list[str] = []
+    while state.xp >= xp_to_next(state.level, rules):
+        state.xp -= xp_to_next(state.level, rules)
+        state.level += 1
+        state.max_hp += rules.level_up_max_hp
+        state.hp = state.max_hp
+        state.potions += rules.level_up_potions
+        messages.append(
+            f"升級！現在等級 {state.level}，最大 HP {state.max_hp}，並獲得 {rules.level_up_potions} 瓶藥水。"
+        )
+    return messages
+
+
+def status_text(state: PlayerState, rules: RpgRules = RULES) -> str:
+    encounter_line = ""
+    if state.enemy is not None:
+        encounter_line = f"\n遭遇中：{state.enemy}（HP {state.enemy_hp}/{state.enemy_max_hp}）"
+    return (
+        f"等級 {state.level} | XP {state.xp}/{xp_to_next(state.level, rules)}\n"
+        f"HP {state.hp}/{state.max_hp} | 金幣 {state.gold} | 藥水 {state.potions}"
+        f"{encounter_line}"
+    )
+
+
+def apply_action(state: PlayerState, action: str, rng: random.Random = random, rules: RpgRules = RULES) -> str:
+    """對一名玩家的狀態執行一個行動（原地修改 state），回傳要顯示的訊息。不處理 start。"""
+    level = state.level
+
+    if action == "help":
+        return HELP_TEXT.format(price=rules.potion_price)
+
+    if action == "status":
+        return status_text(state, rules)
+
+    if action == "rest":
+        heal = min(rules.rest_heal.roll(level, rng), state.max_hp - state.hp)
+        state.hp += heal
+        return f"你休息了一下，回復 {heal} HP。\n{status_text(state, rules)}"
+
+    if action == "potion":
+        if state.potions <= 0:
+            return f"你沒有藥水了。\n{status_text(state, rules)}"
+        if state.hp >= state.max_hp:
+            return f"你已經滿血，不用喝藥水。\n{status_text(state, rules)}"
+        state.potions -= 1
+        heal = min(rules.potion_heal, state.max_hp - state.hp)
+        state.hp += heal
+        return f"你喝下藥水，回復 {heal} HP。\n{status_text(state, rules)}"
+
+    if action == "shop":
+        if state.gold < rules.potion_price:
+            return f"商店：藥水 {rules.potion_price} 金幣/瓶。你的金幣不夠。\n{status_text(state, rules)}"
+        state.gold -= rules.potion_price
+        state.potions += 1
+        return f"你買了一瓶藥水！\n{status_text(state, rules)}"
+
+    if action == "explore":
+        if state.enemy is not None:
+            return f"你已經在遭遇戰中了！先用 /rpg fight 或 /rpg flee。\n{status_text(state, rules)}"
+
+        roll = rng.random()
+        if roll < rules.explore_monster:
+            name = rng.choice(rules.monster_names)
+            max_hp = rules.monster_hp.roll(level, rng)
+            state.enemy = name
+            state.enemy_hp = state.enemy_max_hp = max_hp
+            return f"你遇到了 {name}！用 /rpg fight 開打，或 /rpg flee 逃跑。\n{status_text(state, rules)}"
+        roll -= rules.explore_monster
+        if roll < rules.explore_chest:
+            gold = rules.chest_gold.roll(level, rng)
+            xp = rules.chest_xp.roll(level, rng)
+            state.gold += gold
+            state.xp += xp
+            msgs = [f"你找到一個小寶箱：+{gold} 金幣，+{xp} XP。"]
+            msgs.extend(level_up_if_needed(state, rules))
+            msgs.append(status_text(state, rules))
+            return "\n".join(msgs)
+        roll -= rules.explore_chest
+        if roll < rules.explore_campfire:
+            heal = min(rules.campfire_heal.roll(level, rng), state.max_hp - state.hp)
+            state.hp += heal
+            return f"你找到一處營火，回復 {heal} HP。\n{status_text(state, rules)}"
+        state.gold += rules.lost_gold
+        return f"你迷路了一小段路，但撿到 {rules.lost_gold} 枚金幣。\n{status_text(state, rules)}"
+
+    if action == "fight":
+        if state.enemy is None:
+            return "目前沒有遇到怪，先用 /rpg explore 探索。"
+
+        name = state.enemy
+        player_damage = rules.player_damage.roll(level, rng)
+        state.enemy_hp -= player_damage
+        lines = [f"你對 {name} 造成 {player_damage} 傷害。"]
+
+        if state.enemy_hp <= 0:
+            reward_gold = rules.kill_gold.roll(level, rng)
+            reward_xp = rules.kill_xp.roll(level, rng)
+            state.gold += reward_gold
+            state.xp += reward_xp
+            state.clear_encounter()
+            lines.append(f"{name} 倒下了！獲得 +{reward_gold} 金幣、+{reward_xp} XP。")
+            lines.extend(level_up_if_needed(state, rules))
+            lines.append(status_text(state, rules))
+            return "\n".join(lines)
+
+        monster_damage = rules.monster_damage.roll(level, rng)
+        state.hp -= monster_damage
+        lines.append(f"{name} 反擊，你受到 {monster_damage} 傷害。")
+
+        if state.hp <= 0:
+            lost = max(0, state.gold // rules.death_gold_divisor)
+            state.gold -= lost
+            state.hp = state.max_hp
+            state.clear_encounter()
+            lines.append(f"你倒下了！損失 {lost} 金幣，醒來時已回滿血。")
+            lines.append(status_text(state, rules))
+            return "\n".join(lines)
+
+        lines.append(status_text(state, rules))
+        return "\n".join(lines)
+
+    if action == "flee":
+        if state.enemy is None:
+            return "目前沒有遇到怪，不用逃跑。"
+        penalty = min(state.gold, rules.flee_penalty.roll(level, rng))
+        state.gold -= penalty
+        state.clear_encounter()
+        return f"你成功逃跑了！掉了 {penalty} 金幣。\n{status_text(state, rules)}"
+
+    return "未知行動。用 /rpg help 查看可用指令。"
@@ -0,0 +1,362 @@
+"""
+SQLite（WAL）狀態保存：記憶體中的 dict 照常讀寫，變動先標記為 dirty，
+由背景定期批次寫回；啟動時不整批讀取，第一次用到某個 key 才從資料庫載入。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+from collections.abc import Callable, Iterator, MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+_FULL = None  # dirty 標記：整筆重寫
+
+
+class Codec:
+    """一種狀態在 SQLite 中的存放方式。snapshot 在事件迴圈執行，write/delete 在寫入執行緒。"""
+
+    schema: str = ""
+
+    def load(self, conn: sqlite3.Connection, key: Any) -> Any | None:
+        raise NotImplementedError
+
+    def load_all(self, conn: sqlite3.Connection) -> dict:
+        raise NotImplementedError
+
+    def snapshot(self, key: Any, value: Any, members: set | None) -> Any:
+        raise NotImplementedError
+
+    def write(self, conn: sqlite3.Connection, key: Any, payload: Any):
+        raise NotImplementedError
+
+    def delete(self, conn: sqlite3.Connection, key: Any):
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """一個 key 一列，內容存成 JSON。記憶體中不是 dict 時用 encode / decode 轉換。"""
+
+    def __init__(
+        self,
+        table: str,
+        key_column: str,
+        encode: Callable[[Any], Any] | None = None,
+        decode: Callable[[Any], Any] | None = None,
+    ):
+        self.table = table
+        self.key_column = key_column
+        self.encode = encode
+        self.decode = decode
+        self.schema = f"CREATE TABLE IF NOT EXISTS {table} ({key_column} INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+
+    def load(self, conn, key):
+        row = conn.execute(f"SELECT data FROM {self.table} WHERE {self.key_column} = ?", (key,)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def load_all(self, conn):
+        return {key: self._decode(data) for key, data in conn.execute(f"SELECT {self.key_column}, data FROM {self.table}")}
+
+    def _decode(self, data: str) -> Any:
+        value = json.loads(data)
+        return self.decode(value) if self.decode else value
+
+    def snapshot(self, key, value, members):
+        return json.dumps(self.encode(value) if self.encode else value, ensure_ascii=False)
+
+    def write(self, conn, key, payload):
+        conn.execute(
+            f"INSERT INTO {self.table} ({self.key_column}, data) VALUES (?, ?) "
+            f"ON CONFLICT({self.key_column}) DO UPDATE SET data = excluded.data",
+            (key, payload),
+        )
+
+    def delete(self, conn, key):
+        conn.execute(f"DELETE FROM {self.table} WHERE {self.key_column} = ?", (key,))
+
+
+class NestedCodec(Codec):
+    """
+    巢狀 dict（例如 guild -> user -> 分數）攤平成 (key, member) 一列，
+    只改到某個 member 時只寫那一列。
+    """
+
+    def __init__(
+        self,
+        table: str,
+        key_column: str,
+        member_column: str,
+        value_columns: tuple[str, ...],
+        encode: Callable[[Any], tuple],
+        decode: Callable[[tuple], Any],
+        container: Callable[[dict], Any] = dict,
+    ):
+        self.table = table
+        self.key_column = key_column
+        self.member_column = member_column
+        self.value_columns = value_columns
+        self.encode = encode
+        self.decode = decode
+        self.container = container
+        self.schema = (
+            f"CREATE TABLE IF NOT EXISTS {table} ({key_column} INTEGER NOT NULL, {member_column} NOT NULL, "
+            f"{', '.join(value_columns)}, PRIMARY KEY ({key_column}, {member_column}))"
+        )
+
+    def load(self, conn, key):
+        columns = ", ".join((self.member_column, *self.value_columns))
+        rows = conn.execute(f"SELECT {columns} FROM {self.table} WHERE {self.key_column} = ?", (key,)).fetchall()
+        if not rows:
+            return None
+        return self.container({row[0]: self.decode(row[1:]) for row in rows})
+
+    def load_all(self, conn):
+        columns = ", ".join((self.key_column, self.member_column, *self.value_columns))
+        result: dict = {}
+        for row in conn.execute(f"SELECT {columns} FROM {self.table}"):
+            result.setdefault(row[0], {})[row[1]] = self.decode(row[2:])
+        return {key: self.container(members) for key, members in result.items()}
+
+    def snapshot(self, key, value, members):
+        if members is _FULL:
+            return True, [(member, self.encode(item)) for member, item in value.items()]
+        return False, [(member, self.encode(value[member]) if member in value else None) for member in members]
+
+    def write(self, conn, key, payload):
+        replace_all, rows = payload
+        if replace_all:
+            self.delete(conn, key)
+        placeholders = ", ".join("?" for _ in range(len(self.value_columns) + 2))
+        columns = ", ".join((self.key_column, self.member_column, *self.value_columns))
+        for member, encoded in rows:
+            if encoded is None:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE {self.key_column} = ? AND {self.member_column} = ?",
+                    (key, member),
+                )
+            else:
+                conn.execute(f"INSERT OR REPLACE INTO {self.table} ({columns}) VALUES ({placeholders})", (key, member, *encoded))
+
+    def delete(self, conn, key):
+        conn.execute(f"DELETE FROM {self.table} WHERE {self.key_column} = ?", (key,))
+
+
+class LazyTable(MutableMapping):
+    """
+    行為和 dict 一樣，但第一次查某個 key 時才從資料庫載入。
+    直接修改內層物件（例如 state["hp"] += 1）後要呼叫 touch() 標記。
+    迭代只涵蓋已載入的 key。
+    shared=True 表示其他行程也會寫同一批 key（叢集模式下以使用者為 key 的資料）：
+    沒有待寫回的變動時，每次存取都重新從資料庫讀取，不沿用記憶體中的舊值。
+    """
+
+    def __init__(self, store: StateStore, codec: Codec, shared: bool = False):
+        self._store = store
+        self._codec = codec
+        self._shared = shared
+        self._data: dict = {}
+        self._checked: set = set()
+        self._dirty: dict[Any, set | None] = {}
+        self._deleted: set = set()
+        self._writing: set = set()  # 已交給寫入執行緒、還沒提交的 key
+
+    def _load(self, key) -> bool:
+        if self._shared and key not in self._dirty and key not in self._writing:
+            value = self._codec.load(self._store.reader, key)
+            if value is None:
+                self._data.pop(key, None)
+                return False
+            self._data[key] = value
+            return True
+        if key in self._data:
+            return True
+        if key in self._checked:
+            return False
+        self._checked.add(key)
+        value = self._codec.load(self._store.reader, key)
+        if value is None:
+            return False
+        self._data[key] = value
+        return True
+
+    def preload(self, where: Callable[[Any, Any], bool] | None = None):
+        """一次載入整張表；where(key, value) 為 False 的列不載入（叢集模式下略過其他分片的資料）。"""
+        for key, value in self._codec.load_all(self._store.reader).items():
+            if where is not None and not where(key, value):
+                continue
+            if key not in self._checked:
+                self._data[key] = value
+                self._checked.add(key)
+
+    def __getitem__(self, key):
+        if not self._load(key):
+            raise KeyError(key)
+        return self._data[key]
+
+    def __contains__(self, key) -> bool:
+        return self._load(key)
+
+    def __setitem__(self, key, value):
+        self._checked.add(key)
+        self._data[key] = value
+        self._deleted.discard(key)
+        self._dirty[key] = _FULL
+
+    def __delitem__(self, key):
+        if not self._load(key):
+            raise KeyError(key)
+        del self._data[key]
+        self._dirty.pop(key, None)
+        self._deleted.add(key)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def touch(self, key, *members):
+        """標記 key（或其中的某些 member）有變動，等下次 flush 寫回。"""
+        if key not in self._data:
+            return
+        if not members:
+            self._dirty[key] = _FULL
+            return
+        current = self._dirty.get(key, set())
+        if current is not _FULL:
+            current.update(members)
+            self._dirty[key] = current
+
+    def requeue(self, writes: list, deletes: list):
+        """寫入失敗時把這批變動放回去，下次 flush 重試。"""
+        for key, _ in writes:
+            if key in self._data:
+                self._dirty[key] = _FULL
+        for key in deletes:
+            if key not in self._data:
+                self._deleted.add(key)
+
+    def take_changes(self) -> tuple[list, list]:
+        writes = [
+            (key, self._codec.snapshot(key, self._data[key], members))
+            for key, members in self._dirty.items()
+            if key in self._data
+        ]
+        deletes = list(self._deleted)
+        self._writing = {key for key, _ in writes} | self._deleted
+        self._dirty = {}
+        self._deleted = set()
+        return writes, deletes
+
+
+class StateStore:
+    """讀取走事件迴圈上的連線（單筆主鍵查詢），寫入集中在單一背景執行緒批次提交。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tables: list[LazyTable] = []
+        self._reader: sqlite3.Connection | None = None
+        self._writer: sqlite3.Connection | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-store")
+        self._flush_lock = asyncio.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def reader(self) -> sqlite3.Connection:
+        if self._reader is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._reader = self._connect()
+            with self._reader:
+                for table in self._tables:
+                    self._reader.execute(table._codec.schema)
+        return self._reader
+
+    def table(self, codec: Codec, shared: bool = False) -> LazyTable:
+        table = LazyTable(self, codec, shared)
+        self._tables.append(table)
+        if self._reader is not None:
+            with self._reader:
+                self._reader.execute(codec.schema)
+        return table
+
+    def attach(self, *tables: LazyTable):
+        """
+        重新追蹤先前 release 的表格。功能擴充的 setup 開頭呼叫：重新載入失敗時
+        discord.py 會對舊模組再跑一次 setup，舊模組的表格必須接回來才會被寫回。
+        """
+        for table in tables:
+            # LazyTable 是 Mapping，== 比的是內容（空表格彼此相等），這裡要比身分
+            if not any(t is table for t in self._tables):
+                self._tables.append(table)
+                if self._reader is not None:
+                    with self._reader:
+                        self._reader.execute(table._codec.schema)
+
+    async def release(self, *tables: LazyTable):
+        """先寫回，再停止追蹤這些表格（功能擴充卸載時使用；重新載入後會建立新的表格，從資料庫重新讀取）。"""
+        await self.flush()
+        self._tables = [t for t in self._tables if not any(t is table for table in tables)]
+
+    async def execute(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """在寫入執行緒上以單一交易執行 fn(conn) 並立即提交，不經過批次寫回。"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._execute, fn)
+
+    def _execute(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        if self._writer is None:
+            self._writer = self._connect()
+        with self._writer:
+            return fn(self._writer)
+
+    def _write_batch(self, batch: list[tuple[Codec, list, list]]):
+        if self._writer is None:
+            self._writer = self._connect()
+        with self._writer:
+            for codec, writes, deletes in batch:
+                for key, payload in writes:
+                    codec.write(self._writer, key, payload)
+                for key in deletes:
+                    codec.delete(self._writer, key)
+
+    async def flush(self) -> int:
+        """把目前所有 dirty 項目在一個交易裡寫回，回傳寫入的 key 數。"""
+        async with self._flush_lock:
+            self.reader  # 確保資料表已建立
+            batch = []
+            changed = []
+            for table in self._tables:
+                writes, deletes = table.take_changes()
+                if writes or deletes:
+                    batch.append((table._codec, writes, deletes))
+                    changed.append((table, writes, deletes))
+            if not batch:
+                return 0
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._executor, self._write_batch, batch)
+            except Exception:
+                for table, writes, deletes in changed:
+                    table.requeue(writes, deletes)
+                raise
+            finally:
+                for table, _, _ in changed:
+                    table._writing = set()
+            return sum(len(writes) + len(deletes) for _, writes, deletes in changed)
+
+    async def close(self):
+        await self.flush()
+        self._executor.shutdown(wait=True)
+        for conn in (self._reader, self._writer):
+            if conn is not None:
+                conn.close()
+        self._reader = self._writer = None
@@ -0,0 +1,72 @@
+"""
+雜湊時間輪：大量計時器共用一個固定間隔的 tick，不必每個計時器各開一個 task。
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Hashable
+
+
+class TimerWheel:
+    """
+    - 每個 key 最多一個計時器；重新 schedule 會取代舊的
+    - schedule / cancel 為 O(1)；advance 每個 tick 只看一個槽
+    - 到期時間超過一圈的計時器留在槽裡，等輪到它那一圈才觸發
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512):
+        self.tick = tick
+        self._slots: list[dict[Hashable, int]] = [{} for _ in range(slots)]
+        self._where: dict[Hashable, int] = {}  # key -> 絕對 tick 編號
+        self._last_tick: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def _tick_of(self, when: float) -> int:
+        return math.ceil(when / self.tick)
+
+    def schedule(self, key: Hashable, deadline: float):
+        self.cancel(key)
+        tick_no = self._tick_of(deadline)
+        if self._last_tick is not None and tick_no <= self._last_tick:
+            tick_no = self._last_tick + 1  # 已經過去的時間點：下一個 tick 觸發
+        self._slots[tick_no % len(self._slots)][key] = tick_no
+        self._where[key] = tick_no
+
+    def cancel(self, key: Hashable) -> bool:
+        tick_no = self._where.pop(key, None)
+        if tick_no is None:
+            return False
+        self._slots[tick_no % len(self._slots)].pop(key, None)
+        return True
+
+    def advance(self, now: float) -> list[Hashable]:
+        """推進到 now，回傳這段期間到期的 key（依到期 tick 排序）。"""
+        current = math.floor(now / self.tick)
+        first = self._last_tick is None
+        if first:
+            self._last_tick = current - 1
+        if current <= self._last_tick:
+            return []
+        span = current - self._last_tick
+        if first or span >= len(self._slots):
+            # 落後超過一圈，或第一次推進（之前排入的可能早已過期、散在任何槽裡）：每個槽都掃一次
+            slot_indexes = range(len(self._slots))
+        else:
+            slot_indexes = [t % len(self._slots) for t in range(self._last_tick + 1, current + 1)]
+        expired: list[tuple[int, Hashable]] = []
+        for index in slot_indexes:
+            slot = self._slots[index]
+            due = [(tick_no, key) for key, tick_no in slot.items() if tick_no <= current]
+            for tick_no, key in due:
+                del slot[key]
+                del self._where[key]
+            expired.extend(due)
+        self._last_tick = current
+        expired.sort(key=lambda item: item[0])
+        return [key for _, key in expired]
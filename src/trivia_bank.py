@@ -0,0 +1,261 @@
+"""
+外部問答題庫：以 mmap 讀取的索引檔，只有在出題時才解碼那一題。
+
+檔案格式（little endian）：
+    b"TQB1" | 題數 u32 | 分組數 u32
+    分組表：每組 類別長度 u16 + 類別 UTF-8 + 難度長度 u16 + 難度 UTF-8 + 起 u32 + 迄 u32
+    補 0 到 8 bytes 對齊
+    offsets：(題數 + 1) 個 u64，為每題在資料區的起點（相對於資料區開頭）
+    資料區：每題一段 UTF-8 JSON {"question", "choices", "answer"}
+題目依 (類別, 難度) 排序，所以每個分組都是一段連續的編號區間。
+
+建立題庫：
+    python -m src.trivia_bank build questions.jsonl trivia.tqb
+輸入每行一題：{"question": ..., "choices": [...], "answer": "A", "category": ..., "difficulty": ...}
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import mmap
+import random
+import struct
+import sys
+from dataclasses import dataclass
+
+MAGIC = b"TQB1"
+LABELS = ["A", "B", "C", "D"]
+DEFAULT_CATEGORY = "綜合"
+DEFAULT_DIFFICULTY = "easy"
+
+
+@dataclass(frozen=True)
+class Group:
+    category: str
+    difficulty: str
+    start: int
+    end: int
+
+
+class TriviaBank:
+    """題庫介面：題目以 0..len-1 編號，groups 描述每個 (類別, 難度) 的編號區間。"""
+
+    groups: list[Group]
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def get(self, index: int) -> dict:
+        raise NotImplementedError
+
+    def categories(self) -> list[str]:
+        return sorted({group.category for group in self.groups})
+
+    def ranges(self, category: str | None = None, difficulty: str | None = None) -> list[tuple[int, int]]:
+        return [
+            (group.start, group.end)
+            for group in self.groups
+            if (category is None or group.category == category)
+            and (difficulty is None or group.difficulty == difficulty)
+        ]
+
+
+class ListBank(TriviaBank):
+    """內建的小題庫（全部放在記憶體）。"""
+
+    def __init__(self, questions: list[dict], category: str = DEFAULT_CATEGORY, difficulty: str = DEFAULT_DIFFICULTY):
+        self.questions = questions
+        self.groups = [Group(category, difficulty, 0, len(questions))]
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def get(self, index: int) -> dict:
+        return self.questions[index]
+
+
+class MmapBank(TriviaBank):
+    """常駐記憶體只有分組表；offsets 與題目內容都直接從 mmap 讀。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"不是題庫檔：{path}")
+        self._count, group_count = struct.unpack_from("<II", self._mm, 4)
+        pos = 12
+        self.groups = []
+        for _ in range(group_count):
+            category, pos = _read_str(self._mm, pos)
+            difficulty, pos = _read_str(self._mm, pos)
+            start, end = struct.unpack_from("<II", self._mm, pos)
+            pos += 8
+            self.groups.append(Group(category, difficulty, start, end))
+        pos += -pos % 8
+        self._offsets = memoryview(self._mm)[pos:pos + 8 * (self._count + 1)].cast("Q")
+        self._data_start = pos + 8 * (self._count + 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, index: int) -> dict:
+        begin = self._data_start + self._offsets[index]
+        end = self._data_start + self._offsets[index + 1]
+        return json.loads(self._mm[begin:end])
+
+    @property
+    def closed(self) -> bool:
+        return self._mm.closed
+
+    def close(self):
+        self._offsets.release()
+        self._mm.close()
+
+
+def _read_str(buf, pos: int) -> tuple[str, int]:
+    (length,) = struct.unpack_from("<H", buf, pos)
+    pos += 2
+    return bytes(buf[pos:pos + length]).decode("utf-8"), pos + length
+
+
+# ----------------------------
+# 不重複抽題（shuffle bag）
+# ----------------------------
+
+
+def _mix(value: int, key: int) -> int:
+    value = (value ^ key) * 0x9E3779B1 & 0xFFFFFFFF
+    value ^= value >> 15
+    value = value * 0x85EBCA6B & 0xFFFFFFFF
+    return value ^ (value >> 13)
+
+
+def permute(index: int, size: int, seed: int) -> int:
+    """
+    以 seed 決定的 [0, size) 排列中第 index 個元素。
+    Feistel 網路在 2 的次方範圍內是一對一，超出 size 的值再走一次（cycle walking）。
+    """
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    value = index
+    while True:
+        left, right = value >> half_bits, value & mask
+        for round_key in range(4):
+            left, right = right, left ^ (_mix(right, seed + round_key * 0x632BE5AB) & mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+
+class ShuffleBag:
+    """
+    每個頻道只記 (seed, cursor)：依 seed 的排列依序出題，整輪出完才換新 seed。
+    狀態是可直接存檔的小 dict。
+    """
+
+    def __init__(self, bank: TriviaBank):
+        self.bank = bank
+
+    def draw(self, state: dict | None, category: str | None, difficulty: str | None) -> tuple[dict, dict] | None:
+        """回傳 (題目, 新的 bag 狀態)；沒有符合條件的題目時回傳 None。"""
+        ranges = self.bank.ranges(category, difficulty)
+        sizes = [end - start for start, end in ranges]
+        total = sum(sizes)
+        if total == 0:
+            return None
+        key = f"{category or ''}|{difficulty or ''}"
+        if not state or state.get("key") != key or state.get("size") != total or state.get("cursor", 0) >= total:
+            state = {"key": key, "size": total, "seed": random.getrandbits(32), "cursor": 0}
+
+        slot = permute(state["cursor"], total, state["seed"])
+        # 把排列中的位置對應回實際題號（可能橫跨好幾個分組區間）
+        bounds = []
+        acc = 0
+        for size in sizes:
+            acc += size
+            bounds.append(acc)
+        group = bisect.bisect_right(bounds, slot)
+        offset = slot - (bounds[group - 1] if group else 0)
+        question = self.bank.get(ranges[group][0] + offset)
+        return question, {**state, "cursor": state["cursor"] + 1}
+
+
+# ----------------------------
+# 建立題庫檔
+# ----------------------------
+
+
+def _validate(item: dict, line_no: int) -> dict:
+    choices = item.get("choices")
+    if not isinstance(item.get("question"), str) or not isinstance(choices, list) or not 2 <= len(choices) <= 4:
+        raise ValueError(f"第 {line_no} 行格式錯誤：需要 question 與 2~4 個 choices")
+    if item.get("answer") not in LABELS[: len(choices)]:
+        raise ValueError(f"第 {line_no} 行的 answer 不在選項範圍內")
+    return {"question": item["question"], "choices": [str(c) for c in choices], "answer": item["answer"]}
+
+
+def build(source: str, target: str) -> int:
+    records: list[tuple[str, str, bytes]] = []
+    with open(source, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            payload = json.dumps(_validate(item, line_no), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            records.append((item.get("category") or DEFAULT_CATEGORY, item.get("difficulty") or DEFAULT_DIFFICULTY, payload))
+    records.sort(key=lambda record: (record[0], record[1]))
+
+    groups: list[tuple[str, str, int, int]] = []
+    for index, (category, difficulty, _) in enumerate(records):
+        if groups and groups[-1][:2] == (category, difficulty):
+            groups[-1] = (category, difficulty, groups[-1][2], index + 1)
+        else:
+            groups.append((category, difficulty, index, index + 1))
+
+    with open(target, "wb") as out:
+        out.write(MAGIC + struct.pack("<II", len(records), len(groups)))
+        for category, difficulty, start, end in groups:
+            for text in (category, difficulty):
+                encoded = text.encode("utf-8")
+                out.write(struct.pack("<H", len(encoded)) + encoded)
+            out.write(struct.pack("<II", start, end))
+        out.write(b"\0" * (-out.tell() % 8))
+        offset = 0
+        offsets = bytearray()
+        for _, _, payload in records:
+            offsets += struct.pack("<Q", offset)
+            offset += len(payload)
+        offsets += struct.pack("<Q", offset)
+        out.write(offsets)
+        for _, _, payload in records:
+            out.write(payload)
+    return len(records)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="問答題庫工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="由 JSON Lines 建立 mmap 題庫檔")
+    build_cmd.add_argument("source")
+    build_cmd.add_argument("target")
+    info_cmd = sub.add_parser("info", help="列出題庫的分組")
+    info_cmd.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build(args.source, args.target)
+        print(f"已寫入 {count} 題 -> {args.target}")
+    else:
+        bank = MmapBank(args.path)
+        print(f"{len(bank)} 題")
+        for group in bank.groups:
+            print(f"  {group.category} / {group.difficulty}: {group.end - group.start}")
+        bank.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
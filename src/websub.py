@@ -0,0 +1,200 @@
+"""
+YouTube WebSub（PubSubHubbub）推送模式：接收 hub 的驗證與推送，並維護訂閱租約。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from urllib.parse import parse_qs, urlsplit
+
+import aiohttp
+from aiohttp import web
+
+from .feeds import FeedEntry, parse_feed
+
+DEFAULT_HUB_URL = "https://pubsubhubbub.appspot.com/subscribe"
+TOPIC_URL = "https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}"
+
+
+def channel_id_from_topic(topic: str) -> str | None:
+    values = parse_qs(urlsplit(topic).query).get("channel_id")
+    return values[0] if values else None
+
+
+class WebSubManager:
+    """
+    - sync() 決定要追蹤哪些頻道，maintain() 負責訂閱 / 續約 / 取消
+    - 驗證回呼只接受我們正在訂閱（或正在取消）的 topic
+    - 推送內容解析後交給 on_entries，與輪詢走同一條推播流程
+    """
+
+    def __init__(
+        self,
+        callback_url: str,
+        on_entries: Callable[[str, list[FeedEntry]], Awaitable[None]],
+        hub_url: str = DEFAULT_HUB_URL,
+        secret: str | None = None,
+        lease_seconds: int = 5 * 24 * 3600,
+        on_lease_change: Callable[[str, bool], None] | None = None,
+    ):
+        self.callback_url = callback_url
+        self.callback_path = urlsplit(callback_url).path or "/"
+        self.hub_url = hub_url
+        self.secret = secret
+        self.lease_seconds = lease_seconds
+        self._on_entries = on_entries
+        self._on_lease_change = on_lease_change
+        self._wanted: set[str] = set()
+        self._leases: dict[str, float] = {}  # channel_id -> 租約到期時間
+        self._requested: dict[str, float] = {}  # 已送出請求、等待 hub 驗證
+        self._runner: web.AppRunner | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def is_active(self, channel_id: str) -> bool:
+        expires = self._leases.get(channel_id)
+        return expires is not None and expires > time.time()
+
+    def sync(self, channel_ids: Iterable[str]):
+        self._wanted = set(channel_ids)
+
+    # ---- 對 hub 的請求 ----
+
+    async def _request(self, session: aiohttp.ClientSession, channel_id: str, mode: str) -> bool:
+        data = {
+            "hub.callback": self.callback_url,
+            "hub.mode": mode,
+            "hub.topic": TOPIC_URL.format(channel_id=channel_id),
+            "hub.verify": "async",
+        }
+        if mode == "subscribe":
+            data["hub.lease_seconds"] = str(self.lease_seconds)
+            if self.secret:
+                data["hub.secret"] = self.secret
+        async with session.post(self.hub_url, data=data) as resp:
+            return resp.status < 400
+
+    async def maintain(self, session: aiohttp.ClientSession, concurrency: int = 8):
+        """送出需要的訂閱、續約與取消請求；在租約剩下 10% 時續約。"""
+        now = time.time()
+        renew_margin = self.lease_seconds * 0.1
+        jobs: list[tuple[str, str]] = []
+        for channel_id in self._wanted:
+            requested = self._requested.get(channel_id)
+            if requested is not None and now - requested < 300:
+                continue  # 等待驗證中
+            expires = self._leases.get(channel_id)
+            if expires is None or expires - now < renew_margin:
+                jobs.append((channel_id, "subscribe"))
+        for channel_id in list(self._leases):
+            if channel_id not in self._wanted:
+                jobs.append((channel_id, "unsubscribe"))
+        if not jobs:
+            return
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(channel_id: str, mode: str):
+            async with semaphore:
+                try:
+                    ok = await self._request(session, channel_id, mode)
+                except Exception as exc:
+                    print(f"WebSub {mode} 失敗 ({channel_id}): {exc}")
+                    return
+                if not ok:
+                    print(f"WebSub {mode} 被 hub 拒絕 ({channel_id})")
+                elif mode == "subscribe":
+                    self._requested[channel_id] = time.time()
+                else:
+                    self._drop(channel_id)
+
+        await asyncio.gather(*(run(channel_id, mode) for channel_id, mode in jobs))
+
+    def _drop(self, channel_id: str):
+        self._requested.pop(channel_id, None)
+        if self._leases.pop(channel_id, None) is not None and self._on_lease_change:
+            self._on_lease_change(channel_id, False)
+
+    # ---- 接收端 ----
+
+    async def handle_verify(self, request: web.Request) -> web.Response:
+        mode = request.query.get("hub.mode", "")
+        channel_id = channel_id_from_topic(request.query.get("hub.topic", ""))
+        challenge = request.query.get("hub.challenge", "")
+        if not channel_id:
+            return web.Response(status=404)
+
+        if mode == "subscribe":
+            if channel_id not in self._wanted:
+                return web.Response(status=404)
+            try:
+                lease = int(request.query.get("hub.lease_seconds", self.lease_seconds))
+            except ValueError:
+                lease = self.lease_seconds
+            self._requested.pop(channel_id, None)
+            self._leases[channel_id] = time.time() + lease
+            if self._on_lease_change:
+                self._on_lease_change(channel_id, True)
+            return web.Response(text=challenge)
+        if mode == "unsubscribe":
+            if channel_id in self._wanted:
+                return web.Response(status=404)
+            self._drop(channel_id)
+            return web.Response(text=challenge)
+        if mode == "denied":
+            self._drop(channel_id)
+            return web.Response(text="")
+        return web.Response(status=400)
+
+    def _signature_ok(self, body: bytes, header: str | None) -> bool:
+        if not self.secret:
+            return True
+        if not header or "=" not in header:
+            return False
+        algo, _, digest = header.partition("=")
+        if algo not in ("sha1", "sha256", "sha384", "sha512"):
+            return False
+        expected = hmac.new(self.secret.encode(), body, getattr(hashlib, algo)).hexdigest()
+        return hmac.compare_digest(expected, digest)
+
+    async def handle_notify(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        # 依規格：簽章不符也要回 2xx，只是忽略內容
+        if not self._signature_ok(body, request.headers.get("X-Hub-Signature")):
+            print("WebSub 推送簽章不符，已忽略。")
+            return web.Response(status=202)
+
+        by_channel: dict[str, list[FeedEntry]] = {}
+        for entry in parse_feed(body):
+            if entry.channel_id and entry.channel_id in self._wanted:
+                by_channel.setdefault(entry.channel_id, []).append(entry)
+        for channel_id, entries in by_channel.items():
+            task = asyncio.create_task(self._dispatch(channel_id, entries))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return web.Response(status=202)
+
+    async def _dispatch(self, channel_id: str, entries: list[FeedEntry]):
+        try:
+            await self._on_entries(channel_id, entries)
+        except Exception as exc:
+            print(f"WebSub 推送處理錯誤 ({channel_id}): {exc}")
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(self.callback_path, self.handle_verify)
+        app.router.add_post(self.callback_path, self.handle_notify)
+        return app
+
+    async def start(self, host: str, port: int):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
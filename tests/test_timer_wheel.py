@@ -0,0 +1,29 @@
+from src.timer_wheel import TimerWheel
+
+
+def test_past_deadline_before_first_advance_fires_immediately():
+    wheel = TimerWheel(tick=1.0, slots=512)
+    now = 1_000_000.0
+    wheel.schedule("expired", now - 100)  # 例如重啟後還原、早已過期的回合
+    wheel.schedule("later", now + 5)
+    assert wheel.advance(now) == ["expired"]
+    assert "later" in wheel
+
+
+def test_deadlines_fire_on_their_tick():
+    wheel = TimerWheel(tick=1.0, slots=8)
+    wheel.advance(100.0)
+    wheel.schedule("a", 102.0)
+    wheel.schedule("b", 120.0)  # 超過一圈
+    assert wheel.advance(101.0) == []
+    assert wheel.advance(102.0) == ["a"]
+    assert wheel.advance(119.0) == []
+    assert wheel.advance(120.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_past_deadline_after_advance_fires_next_tick():
+    wheel = TimerWheel(tick=1.0, slots=8)
+    wheel.advance(50.0)
+    wheel.schedule("late", 10.0)
+    assert wheel.advance(51.0) == ["late"]
@@ -0,0 +1,529 @@
+"""
+離線壓測：用假的 Interaction 直接驅動真正的指令處理函式（/gif、/rpg、/trivia、/autofeed）與 feed 輪詢，
+Tenor、cataas、YouTube 換成本機替身（tools/stub_upstreams.py），可調延遲與失敗率。
+
+    python tools/bench_commands.py                                   # 全部情境，預設規模
+    python tools/bench_commands.py --scenario rpg --rpg-players 1000000
+    python tools/bench_commands.py --scenario poll --subscriptions 10000 --latency 0.05
+    python tools/bench_commands.py --json before.json                 # 存下結果
+    python tools/bench_commands.py --compare before.json              # 和之前的結果比較
+
+每個情境都在新的 Python 行程裡跑（暫存的資料庫、固定的 seed、事先產生好的操作序列），
+不同 commit 之間的數字可以直接比較；機器比較吵時加上 --repeat 取居中的一次。輸出每秒處理數、延遲 p50 / p99（total 為處理函式結束，
+first 為第一次回應），以及平均每個伺服器／使用者／追蹤佔用的記憶體（RSS 增量）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("gif", "rpg", "trivia", "autofeed", "poll")
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # 沒有 /proc 時退而用峰值
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ----------------------------
+# 假的 Discord 互動
+# ----------------------------
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.mention = f"<#{channel_id}>"
+
+
+class FakeResponse:
+    def __init__(self, interaction: FakeInteraction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self):
+        if self._done:
+            raise RuntimeError("這個互動已經回應過了")
+        if self._interaction.discord_latency:
+            await asyncio.sleep(self._interaction.discord_latency)
+        self._done = True
+        self._interaction.first_response = time.perf_counter()
+
+    async def defer(self, *, ephemeral: bool = False, thinking: bool = False):
+        await self._respond()
+
+    async def send_message(self, content: str | None = None, **kwargs):
+        await self._respond()
+        self._interaction.last_content = content
+
+    async def edit_message(self, *, content: str | None = None, **kwargs):
+        await self._respond()
+        self._interaction.last_content = content
+
+
+class FakeInteraction:
+    """處理函式用到的那幾個屬性；回應只記時間，不送出。discord_latency 模擬每次呼叫 Discord API 的往返。"""
+
+    def __init__(self, interaction_id: int, user_id: int, guild_id: int, channel_id: int, discord_latency: float = 0.0):
+        self.id = interaction_id
+        self.user = FakeUser(user_id)
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.discord_latency = discord_latency
+        self.created = time.perf_counter()
+        self.first_response: float | None = None
+        self.last_content: str | None = None
+        self.response = FakeResponse(self)
+
+    async def edit_original_response(self, *, content: str | None = None, **kwargs):
+        if not self.response.is_done():
+            raise RuntimeError("還沒回應就編輯原始訊息")
+        if self.discord_latency:
+            await asyncio.sleep(self.discord_latency)
+        self.last_content = content
+
+
+# ----------------------------
+# 情境（在子行程中執行）
+# ----------------------------
+
+Op = Callable[[int], Awaitable[FakeInteraction]]
+
+
+def _choice(value: str):
+    from discord import app_commands
+
+    return app_commands.Choice(name=value, value=value)
+
+
+def _guild_id(index: int) -> int:
+    # 看起來像真的 snowflake，分片公式才會分散
+    return (index + 1) << 22 | 1
+
+
+def _populate(rows: int, insert: Callable[[sqlite3.Connection, int, int], None], batch: int = 50_000):
+    from src.core import store
+
+    store.reader  # 建立資料表
+    conn = sqlite3.connect(store.path)
+    with conn:
+        for start in range(0, rows, batch):
+            insert(conn, start, min(rows, start + batch))
+    conn.close()
+
+
+async def setup_gif(args, rng: random.Random) -> tuple[Op, dict]:
+    from src.extensions import gif as ext
+
+    ext.cat_pool.start()
+    words = [f"{a} {b}" for a in ("happy", "sad", "sleepy", "angry", "dancing") for b in ("cat", "dog", "frog", "duck")]
+    prompts = [f"{rng.choice(words)} {rng.randrange(args.gif_queries)}" for _ in range(args.requests)]
+    users = [rng.randrange(args.users) + 1 for _ in range(args.requests)]
+
+    async def op(i: int) -> FakeInteraction:
+        interaction = FakeInteraction(i, users[i], _guild_id(users[i] % args.guilds), 1, args.discord_latency)
+        await ext.gif.callback(interaction, prompts[i])
+        return interaction
+
+    return op, {"query": len(set(prompts))}
+
+
+async def setup_rpg(args, rng: random.Random) -> tuple[Op, dict]:
+    from bench_rpg_memory import sample_rows
+
+    from src.extensions import rpg as ext
+
+    def insert(conn, start, end):
+        rows = sample_rows(end - start, args.seed + start, encounter_ratio=0.2)
+        conn.executemany(
+            "INSERT INTO rpg_players (user_id, data) VALUES (?, ?)", zip(range(start + 1, end + 1), rows)
+        )
+
+    _populate(args.rpg_players, insert)
+    weights = {"explore": 40, "fight": 30, "rest": 10, "potion": 5, "status": 10, "shop": 5}
+    actions = rng.choices(list(weights), weights=list(weights.values()), k=args.requests)
+    users = [rng.randrange(args.rpg_players) + 1 for _ in range(args.requests)]
+    choices = {action: _choice(action) for action in weights}
+
+    async def op(i: int) -> FakeInteraction:
+        interaction = FakeInteraction(i, users[i], _guild_id(users[i] % args.guilds), 1, args.discord_latency)
+        await ext.rpg.callback(interaction, choices[actions[i]])
+        return interaction
+
+    return op, {"player": len(set(users))}
+
+
+async def setup_trivia(args, rng: random.Random) -> tuple[Op, dict]:
+    from src.extensions import trivia as ext
+
+    group = ext.TriviaGroup()
+    channels = [(guild, guild * 2 + offset) for guild in range(args.guilds) for offset in range(2)]
+    plan = []
+    for _ in range(args.requests):
+        guild, channel = rng.choice(channels)
+        roll = rng.random()
+        kind = "ask" if roll < 0.2 else "score" if roll < 0.25 else "answer"
+        plan.append((kind, guild, channel + 1, rng.randrange(args.users) + 1, rng.choice("ABCD")))
+    answers = {label: _choice(label) for label in "ABCD"}
+
+    async def reveal():
+        # trivia_tick 的揭曉部分（不送訊息）
+        while True:
+            await asyncio.sleep(0.25)
+            for channel_id in ext.trivia_wheel.advance(time.time()):
+                ext._close_round(channel_id)
+
+    asyncio.get_running_loop().create_task(reveal())
+
+    async def op(i: int) -> FakeInteraction:
+        kind, guild, channel, user, answer = plan[i]
+        interaction = FakeInteraction(i, user, _guild_id(guild), channel, args.discord_latency)
+        if kind == "ask":
+            await group.ask.callback(group, interaction)
+        elif kind == "score":
+            await group.score.callback(group, interaction)
+        else:
+            await group.answer.callback(group, interaction, answers[answer])
+        return interaction
+
+    return op, {"guild": args.guilds, "channel": len(channels)}
+
+
+def _feed_channel(index: int) -> str:
+    return f"UCbench{index:017d}"
+
+
+def _populate_subscriptions(args):
+    from stub_upstreams import FEED_ENTRIES
+
+    from src.extensions import autofeed as ext
+
+    channels = max(1, args.subscriptions // 2)  # 大約一半的追蹤是熱門頻道被很多伺服器重複追蹤
+    rng = random.Random(args.seed)
+
+    def insert(conn, start, end):
+        rows = set()
+        for index in range(start, end):
+            guild = _guild_id(index % args.guilds)
+            popular = min(channels - 1, int(rng.paretovariate(1.2)) - 1)
+            channel = _feed_channel(popular if index % 2 else rng.randrange(channels))
+            rows.add((guild, channel, guild + 1, f"{channel}-{FEED_ENTRIES}"))
+        conn.executemany("INSERT OR IGNORE INTO video_subscriptions VALUES (?, ?, ?, ?)", rows)
+
+    _populate(args.subscriptions, insert)
+    ext.video_subscriptions.preload()
+    subscriptions = sum(len(feeds) for feeds in ext.video_subscriptions.values())
+    return ext, channels, subscriptions
+
+
+async def setup_autofeed(args, rng: random.Random) -> tuple[Op, dict]:
+    ext, channels, subscriptions = _populate_subscriptions(args)
+    group = ext.AutoFeed()
+    plan = []
+    for _ in range(args.requests):
+        roll = rng.random()
+        kind = "list" if roll < 0.7 else "add" if roll < 0.9 else "remove"
+        plan.append((kind, rng.randrange(args.guilds), _feed_channel(rng.randrange(channels))))
+
+    async def op(i: int) -> FakeInteraction:
+        kind, guild, channel = plan[i]
+        interaction = FakeInteraction(i, 1, _guild_id(guild), 1, args.discord_latency)
+        if kind == "list":
+            await group.list.callback(group, interaction)
+        elif kind == "add":
+            await group.add.callback(group, interaction, channel, FakeChannel(_guild_id(guild) + 1))
+        else:
+            await group.remove.callback(group, interaction, channel)
+        return interaction
+
+    return op, {"guild": args.guilds, "subscription": subscriptions}
+
+
+async def run_poll(args) -> dict:
+    """不是指令：量測 poll_videos 每一輪的耗時與每秒抓取的 feed 數。第一輪是冷啟動，之後每輪把所有頻道提前到期。"""
+    from src.metrics import FEED_RESULTS
+
+    ext, _, subscriptions = _populate_subscriptions(args)
+    announced = 0
+
+    def enqueue(target_id, entries, on_done=None):
+        nonlocal announced
+        announced += len(entries)
+        if on_done is not None:
+            on_done(True)
+
+    ext.dispatcher.enqueue = enqueue  # 推播送到 Discord 的那一端
+    results = ("changed", "not_modified", "failed")
+    cycles = []
+    for _ in range(args.poll_rounds):
+        now = time.time()
+        for channel_id in ext._feed_channels(ext._collect_feed_subscribers()):
+            ext.feed_scheduler.poll_soon(channel_id, now)
+        started = time.perf_counter()
+        await ext.poll_videos.coro()
+        cycles.append(time.perf_counter() - started)
+    feeds = int(sum(FEED_RESULTS.get(result) for result in results))
+    seconds = sum(cycles)
+    return {
+        "ops": feeds,
+        "seconds": seconds,
+        "ops_per_sec": feeds / seconds if seconds else None,
+        "p50_ms": percentile(cycles, 0.5) * 1000,
+        "p99_ms": percentile(cycles, 0.99) * 1000,
+        "first_p50_ms": None,
+        "first_p99_ms": None,
+        "errors": int(FEED_RESULTS.get("failed")),
+        "announced": announced,
+        "units": {"guild": args.guilds, "subscription": subscriptions, "feed": len(ext.feed_scheduler)},
+    }
+
+
+async def drive(op: Op, count: int, concurrency: int) -> dict:
+    """concurrency 個 coroutine 依序領取操作編號（封閉迴圈），全部做完為止。"""
+    totals: list[float] = []
+    firsts: list[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < count:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                interaction = await op(index)
+            except Exception as exc:
+                errors += 1
+                if errors <= 3:
+                    print(f"操作 {index} 失敗：{type(exc).__name__}: {exc}", file=sys.stderr)
+                continue
+            totals.append(time.perf_counter() - started)
+            if interaction.first_response is not None:
+                firsts.append(interaction.first_response - interaction.created)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    ms = lambda value: value * 1000 if value is not None else None  # noqa: E731
+    return {
+        "ops": len(totals),
+        "seconds": seconds,
+        "ops_per_sec": len(totals) / seconds if seconds else None,
+        "p50_ms": ms(percentile(totals, 0.5)),
+        "p99_ms": ms(percentile(totals, 0.99)),
+        "first_p50_ms": ms(percentile(firsts, 0.5)),
+        "first_p99_ms": ms(percentile(firsts, 0.99)),
+        "errors": errors,
+    }
+
+
+async def _child(args):
+    sys.path.insert(0, ROOT)
+    from stub_upstreams import StubHttpClient, StubUpstreams
+
+    from src import config, core
+
+    stub = StubUpstreams(args.latency, args.failure_rate, args.change_rate, args.seed)
+    base = await stub.start()
+    core.bot.http_session = StubHttpClient(
+        base,
+        limit_per_host=config.HTTP_LIMIT_PER_HOST,
+        connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+        read_timeout=config.HTTP_READ_TIMEOUT,
+        retries=config.HTTP_RETRIES,
+        failure_threshold=config.HTTP_BREAKER_THRESHOLD,
+        reset_timeout=config.HTTP_BREAKER_RESET,
+    )
+
+    async def flush_state():
+        while True:
+            await asyncio.sleep(config.STATE_FLUSH_INTERVAL)
+            await core.store.flush()
+
+    flusher = asyncio.create_task(flush_state())
+    rng = random.Random(args.seed)
+    base_rss = rss_bytes()
+    setup_started = time.perf_counter()
+    if args.scenario == "poll":
+        result = await run_poll(args)
+        setup_seconds = None
+    else:
+        setup = globals()[f"setup_{args.scenario}"]
+        op, units = await setup(args, rng)
+        setup_seconds = time.perf_counter() - setup_started
+        result = await drive(op, args.requests, args.concurrency)
+        result["units"] = units
+    grown = rss_bytes() - base_rss
+    flusher.cancel()
+    await core.store.close()
+    await core.bot.http_session.close()
+    await stub.close()
+    result.update(
+        scenario=args.scenario,
+        setup_seconds=setup_seconds,
+        rss_growth_mb=grown / 2**20,
+        bytes_per={unit: grown / count for unit, count in result.pop("units").items() if count},
+        upstream_requests=stub.requests,
+    )
+    print(json.dumps(result, ensure_ascii=False))
+
+
+# ----------------------------
+# 主程式
+# ----------------------------
+
+
+def run_scenario(name: str, args) -> dict:
+    forwarded = [
+        f"--{key.replace('_', '-')}={value}"
+        for key, value in vars(args).items()
+        if key not in ("scenario", "json", "compare", "child", "repeat") and value is not None
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            STATE_DB_PATH=os.path.join(tmp, "state.sqlite3"),
+            TENOR_KEY="bench",
+            TRIVIA_ROUND_SECONDS="2",
+            FEED_REQUESTS_PER_MINUTE=str(10**9),  # 量的是處理能力，不是額度
+            WEBSUB_CALLBACK_URL="",
+            AUDIO_CACHE_DIR="",
+            METRICS_PORT="",
+            SHARD_COUNT="",
+            SHARD_IDS="",
+            CLUSTER_COUNT="",
+            CLUSTER_ID="",
+        )
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", f"--scenario={name}", *forwarded],
+            env=env,
+            cwd=tmp,
+            capture_output=True,
+            text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"情境 {name} 失敗：\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def environment() -> dict:
+    def git(*cmd: str) -> str:
+        try:
+            return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _fmt(value, spec: str = ".1f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_results(results: list[dict], baseline: dict[str, dict] | None = None):
+    print(f"{'情境':<10}{'次數':>9}{'每秒':>11}{'p50 ms':>9}{'p99 ms':>9}{'first p99':>10}{'錯誤':>6}  每單位記憶體")
+    for result in results:
+        memory = "，".join(f"{unit} {value:,.0f} B" for unit, value in result["bytes_per"].items())
+        print(
+            f"{result['scenario']:<10}{result['ops']:>9}{_fmt(result['ops_per_sec']):>11}"
+            f"{_fmt(result['p50_ms'], '.2f'):>9}{_fmt(result['p99_ms'], '.2f'):>9}"
+            f"{_fmt(result['first_p99_ms'], '.2f'):>10}{result['errors']:>6}  {memory}"
+        )
+        old = (baseline or {}).get(result["scenario"])
+        if old and old.get("ops_per_sec") and result.get("ops_per_sec") and old.get("p99_ms") and result.get("p99_ms"):
+            print(
+                f"{'':<10}  對照 {old['ops_per_sec']:.1f}/s、p99 {old['p99_ms']:.2f} ms："
+                f"每秒 {result['ops_per_sec'] / old['ops_per_sec'] - 1:+.1%}，p99 {result['p99_ms'] / old['p99_ms'] - 1:+.1%}"
+            )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="指令處理與 feed 輪詢的離線壓測")
+    parser.add_argument("--scenario", choices=(*SCENARIOS, "all"), default="all")
+    parser.add_argument("--requests", type=int, default=20_000, help="每個情境的操作數")
+    parser.add_argument("--concurrency", type=int, default=64, help="同時進行的互動數")
+    parser.add_argument("--guilds", type=int, default=1_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--subscriptions", type=int, default=10_000, help="autofeed / poll 的追蹤數")
+    parser.add_argument("--rpg-players", type=int, default=1_000_000, help="資料庫裡既有的 RPG 玩家數")
+    parser.add_argument("--gif-queries", type=int, default=500, help="不同 /gif 關鍵字的數量（影響快取命中）")
+    parser.add_argument("--poll-rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02, help="替身上游的平均延遲（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="替身上游回 503 的比例")
+    parser.add_argument("--change-rate", type=float, default=0.1, help="feed 每次被抓取時多一部新片的機率")
+    parser.add_argument("--discord-latency", type=float, default=0.0, help="模擬每次 Discord API 呼叫的往返（秒）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="每個情境跑幾次，取每秒處理數居中的那一次")
+    parser.add_argument("--json", help="把結果（含 commit 與環境）寫到這個檔案")
+    parser.add_argument("--compare", help="和之前 --json 存下的結果比較")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        asyncio.run(_child(args))
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            saved = json.load(f)
+        baseline = {result["scenario"]: result for result in saved["results"]}
+        print(f"對照：{saved['environment'].get('commit') or '?'}（{args.compare}）")
+    names = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    results = []
+    for name in names:
+        print(f"執行 {name} …", file=sys.stderr)
+        runs = sorted((run_scenario(name, args) for _ in range(args.repeat)), key=lambda run: run["ops_per_sec"] or 0)
+        results.append(runs[len(runs) // 2])
+    print_results(results, baseline)
+    if args.json:
+        report = {
+            "environment": environment(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("json", "compare", "child")},
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+量測每路語音串流的 FFmpeg CPU 時間：比較 Opus 直通（-c:a copy）與重新編碼（libopus）。
+
+    python tools/bench_ffmpeg.py song.webm --streams 1 4 16
+    python tools/bench_ffmpeg.py "https://www.youtube.com/watch?v=..." --resolve
+
+同時開 N 個 FFmpeg 處理同一個來源的前 --seconds 秒（不加 -re，全速跑），
+用 wait4 取得每個行程的 user + sys 時間；「每核可承載路數」= 音訊秒數 / 每路 CPU 秒數。
+--resolve 會先用與 /play 相同的 yt-dlp 設定取得串流網址（網路速度也會影響結果，建議先下載成檔案再測）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.music import FFMPEG_BEFORE_OPTIONS  # noqa: E402
+
+
+def ffmpeg_args(source: str, passthrough: bool, seconds: float, bitrate: int = 128) -> list[str]:
+    # 與 discord.FFmpegOpusAudio（discord.py 2.4）送給 FFmpeg 的參數相同，只是輸出丟掉
+    args = ["ffmpeg"]
+    if source.startswith("http"):
+        args += shlex.split(FFMPEG_BEFORE_OPTIONS)
+    args += ["-i", source, "-t", str(seconds)]
+    args += [
+        "-map_metadata", "-1",
+        "-f", "opus",
+        "-c:a", "copy" if passthrough else "libopus",
+        "-ar", "48000",
+        "-ac", "2",
+        "-b:a", f"{bitrate}k",
+        "-loglevel", "error",
+        "-fec", "true",
+        "-packet_loss", "15",
+        "-blocksize", "8192",
+        "-vn",
+        "pipe:1",
+    ]
+    return args
+
+
+def run(source: str, passthrough: bool, streams: int, seconds: float) -> dict:
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen(ffmpeg_args(source, passthrough, seconds), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        for _ in range(streams)
+    ]
+    cpu = []
+    failed = 0
+    for process in processes:
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        failed += process.returncode != 0
+        cpu.append(usage.ru_utime + usage.ru_stime)
+    wall = time.perf_counter() - started
+    per_stream = sum(cpu) / streams
+    return {
+        "streams": streams,
+        "wall": wall,
+        "cpu_per_stream": per_stream,
+        "streams_per_core": seconds / per_stream if per_stream else float("inf"),
+        "failed": failed,
+    }
+
+
+def resolve(query: str) -> str:
+    from src.extractor import YDL_OPTS, extract_track
+
+    track = extract_track(query, YDL_OPTS)
+    print(f"{track.title}: acodec={track.acodec} abr={track.abr} asr={track.asr}")
+    return track.stream_url
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="FFmpeg 每路串流 CPU 時間")
+    parser.add_argument("source", help="音訊檔或網址；搭配 --resolve 時可用 /play 的查詢字串")
+    parser.add_argument("--resolve", action="store_true", help="先用 yt-dlp 解析成串流網址")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 4, 16], help="同時串流數")
+    parser.add_argument("--seconds", type=float, default=60, help="每路處理的音訊長度")
+    parser.add_argument("--mode", choices=["copy", "transcode", "both"], default="both")
+    args = parser.parse_args(argv)
+
+    source = resolve(args.source) if args.resolve else args.source
+    modes = {"copy": [True], "transcode": [False], "both": [True, False]}[args.mode]
+    print(f"{'mode':<10}{'streams':>8}{'wall s':>9}{'cpu s/stream':>14}{'streams/core':>14}")
+    for passthrough in modes:
+        for streams in args.streams:
+            result = run(source, passthrough, streams, args.seconds)
+            note = f"  ({result['failed']} 個失敗)" if result["failed"] else ""
+            print(
+                f"{'copy' if passthrough else 'libopus':<10}{streams:>8}{result['wall']:>9.2f}"
+                f"{result['cpu_per_stream']:>14.3f}{result['streams_per_core']:>14.1f}{note}"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+量測 RPG 玩家狀態每人佔用的記憶體：舊的 dict（含巢狀 encounter dict）對照 __slots__ 的 PlayerState。
+
+    python tools/bench_rpg_memory.py --players 1000000
+
+兩種表示法都從同一份 JSON 載入（與 Bot 從 SQLite 讀回時相同），放進以 user ID 為 key 的 dict，
+用 tracemalloc 量出「狀態物件本身」與「含 user ID 與 dict 項目」的每人位元組數。
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rpg import RULES, PlayerState  # noqa: E402
+
+
+def sample_rows(players: int, seed: int, encounter_ratio: float) -> list[str]:
+    """產生一批看起來像線上玩家的 JSON（等級、金幣有高有低，部分正在遭遇戰中）。"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(players):
+        level = min(60, int(rng.expovariate(1 / 8)) + 1)
+        max_hp = RULES.start_hp + RULES.level_up_max_hp * (level - 1)
+        encounter = None
+        if rng.random() < encounter_ratio:
+            monster_hp = RULES.monster_hp.roll(level, rng)
+            encounter = {"name": rng.choice(RULES.monster_names), "hp": rng.randint(1, monster_hp), "max_hp": monster_hp}
+        state = {
+            "level": level,
+            "xp": rng.randint(0, RULES.xp_to_next.min(level) - 1),
+            "gold": rng.randint(0, 40 * level),
+            "max_hp": max_hp,
+            "hp": rng.randint(1, max_hp),
+            "potions": rng.randint(0, 5),
+            "encounter": encounter,
+        }
+        rows.append(json.dumps(state, ensure_ascii=False))
+    return rows
+
+
+def measure(rows: list[str], decode, first_user_id: int = 10**17) -> tuple[float, float]:
+    """回傳（狀態物件 bytes/人, 含 user ID 與 dict 項目 bytes/人）。"""
+    gc.collect()
+    tracemalloc.start()
+    states = [decode(json.loads(row)) for row in rows]
+    objects = tracemalloc.get_traced_memory()[0]
+    table = {first_user_id + index: state for index, state in enumerate(states)}
+    total = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # 扣掉暫存的 list 本身（每人一個指標）
+    list_bytes = sys.getsizeof(states)
+    del table, states
+    return (objects - list_bytes) / len(rows), (total - list_bytes) / len(rows)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="RPG 玩家狀態記憶體量測")
+    parser.add_argument("--players", type=int, default=200_000)
+    parser.add_argument("--encounter-ratio", type=float, default=0.3, help="正在遭遇戰中的玩家比例")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = sample_rows(args.players, args.seed, args.encounter_ratio)
+    results = {
+        "dict": measure(rows, lambda data: data),
+        "PlayerState": measure(rows, PlayerState.from_dict),
+    }
+    print(f"{args.players} 名玩家，{args.encounter_ratio:.0%} 在遭遇戰中")
+    print(f"{'表示法':<14}{'狀態 B/人':>12}{'含 key B/人':>14}{'百萬人 MiB':>12}")
+    for name, (objects, total) in results.items():
+        print(f"{name:<14}{objects:>12.1f}{total:>14.1f}{total * 1e6 / 2**20:>12.1f}")
+    before, after = results["dict"][1], results["PlayerState"][1]
+    print(f"每人節省 {before - after:.1f} B（{1 - after / before:.0%}）")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
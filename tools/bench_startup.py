@@ -0,0 +1,80 @@
+"""
+量測 Bot 不連 Discord 的啟動成本：匯入、載入各功能擴充、計算指令樹雜湊，並確認 yt_dlp 沒有被提早載入。
+
+    python tools/bench_startup.py --runs 5
+
+每次都開新的 Python 行程（從行程啟動開始算，和真正啟動一樣），取各階段的中位數。
+連線到 Discord 之後的「登入」「就緒」要看 Bot 實際啟動時印出的「啟動耗時」那一行。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _child():
+    sys.path.insert(0, ROOT)
+    from src import bot as app  # noqa: E402
+
+    async with app.bot:
+        await app.load_extensions()
+        app.command_tree_hash()
+        app.startup.mark("指令樹雜湊")
+        result = {"marks": app.startup.marks, "yt_dlp": "yt_dlp" in sys.modules}
+    await app.store.close()
+    print(json.dumps(result, ensure_ascii=False))
+
+
+def run_once() -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            STATE_DB_PATH=os.path.join(tmp, "state.sqlite3"),
+            CAT_POOL_SIZE="0",  # 不要在背景連外預熱
+            WEBSUB_CALLBACK_URL="",
+            AUDIO_CACHE_DIR="",
+        )
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            env=env,
+            cwd=tmp,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Bot 啟動時間量測（離線）")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        asyncio.run(_child())
+        return
+
+    runs = [run_once() for _ in range(args.runs)]
+    names = list(runs[0]["marks"])
+    print(f"{'階段':<16}{'累計 s':>10}{'本階段 s':>10}")
+    previous = 0.0
+    for name in names:
+        at = statistics.median(run["marks"][name] for run in runs)
+        print(f"{name:<16}{at:>10.3f}{at - previous:>10.3f}")
+        previous = at
+    if any(run["yt_dlp"] for run in runs):
+        print("警告：啟動時已載入 yt_dlp（應該等到第一次 /play 才載入）")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
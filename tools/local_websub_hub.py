@@ -0,0 +1,94 @@
+"""
+本機 WebSub hub 替身，用來在不連外的情況下測試 /autofeed 的推送模式。
+
+    python tools/local_websub_hub.py --port 8585
+    # .env：WEBSUB_HUB_URL=http://127.0.0.1:8585/subscribe
+    #       WEBSUB_CALLBACK_URL=http://127.0.0.1:8080/websub
+
+- POST /subscribe：與真正的 hub 相同的表單欄位，會回呼 callback 驗證 challenge
+- POST /publish?topic=<topic>：把 body（Atom XML）推送給該 topic 的所有訂閱者
+- GET  /subscriptions：列出目前已驗證的訂閱
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import secrets
+
+import aiohttp
+from aiohttp import web
+
+# topic -> callback -> secret
+subscriptions: dict[str, dict[str, str | None]] = {}
+background: set[asyncio.Task] = set()
+
+
+async def verify(callback: str, mode: str, topic: str, lease: str, secret: str | None):
+    challenge = secrets.token_hex(8)
+    params = {"hub.mode": mode, "hub.topic": topic, "hub.challenge": challenge, "hub.lease_seconds": lease}
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(callback, params=params) as resp:
+                ok = resp.status < 300 and (await resp.text()) == challenge
+    except aiohttp.ClientError as exc:
+        print(f"verify failed {callback}: {exc}")
+        return
+    print(f"verify {mode} {topic} -> {callback}: {'ok' if ok else 'rejected'}")
+    if not ok:
+        return
+    if mode == "subscribe":
+        subscriptions.setdefault(topic, {})[callback] = secret
+    else:
+        subscriptions.get(topic, {}).pop(callback, None)
+
+
+async def handle_subscribe(request: web.Request) -> web.Response:
+    form = await request.post()
+    callback = form.get("hub.callback")
+    mode = form.get("hub.mode")
+    topic = form.get("hub.topic")
+    if not callback or not topic or mode not in ("subscribe", "unsubscribe"):
+        return web.Response(status=400, text="bad request")
+    task = asyncio.create_task(
+        verify(str(callback), str(mode), str(topic), str(form.get("hub.lease_seconds", "3600")), form.get("hub.secret"))
+    )
+    background.add(task)
+    task.add_done_callback(background.discard)
+    return web.Response(status=202)
+
+
+async def handle_publish(request: web.Request) -> web.Response:
+    topic = request.query.get("topic", "")
+    body = await request.read()
+    delivered = 0
+    async with aiohttp.ClientSession() as session:
+        for callback, secret in list(subscriptions.get(topic, {}).items()):
+            headers = {"Content-Type": "application/atom+xml"}
+            if secret:
+                headers["X-Hub-Signature"] = "sha1=" + hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+            async with session.post(callback, data=body, headers=headers) as resp:
+                delivered += resp.status < 300
+    return web.json_response({"delivered": delivered})
+
+
+async def handle_list(request: web.Request) -> web.Response:
+    return web.json_response({topic: list(callbacks) for topic, callbacks in subscriptions.items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8585)
+    args = parser.parse_args()
+    app = web.Application()
+    app.router.add_post("/subscribe", handle_subscribe)
+    app.router.add_post("/publish", handle_publish)
+    app.router.add_get("/subscriptions", handle_list)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+RPG 平衡模擬器：用與 Bot 相同的 src/rpg.py 規則表，模擬大量玩家各自執行一連串行動。
+
+    python tools/rpg_sim.py --players 1000000 --actions 1000          # NumPy 批次引擎（需 pip install numpy）
+    python tools/rpg_sim.py --players 2000 --actions 1000 --engine python   # 直接呼叫 Bot 的 apply_action，用來對照
+
+輸出等級曲線、死亡率與金幣經濟的分布。
+模擬玩家的策略：遭遇戰中血量低於怪物最大傷害時先喝藥，沒藥就逃跑，否則繼續打；
+平常血量低於 --rest-below 就休息，藥水少於 --keep-potions 且買得起就去商店，其餘時間都在探索。
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rpg import RULES, PlayerState, Roll, RpgRules, apply_action, new_player  # noqa: E402
+
+ACTIONS = ("explore", "fight", "flee", "rest", "potion", "shop")
+
+
+@dataclass
+class Policy:
+    rest_below: float = 0.5
+    keep_potions: int = 2
+    flee: bool = True
+
+
+@dataclass
+class Report:
+    players: int
+    actions: int
+    level_hists: dict[int, list[int]] = field(default_factory=dict)  # 第幾步 -> 各等級人數
+    death_hist: list[int] = field(default_factory=list)  # 死亡次數 -> 人數
+    final_gold: list[int] = field(default_factory=list)  # 已排序
+    flows: dict[str, int] = field(default_factory=lambda: dict.fromkeys(("earned", "spent", "death", "flee"), 0))
+    action_counts: dict[str, int] = field(default_factory=lambda: dict.fromkeys(ACTIONS, 0))
+    seconds: float = 0.0
+
+
+def checkpoints(actions: int) -> list[int]:
+    return sorted({max(1, actions * n // 10) for n in (1, 2, 5, 10)})
+
+
+def _merge_hist(into: list[int], counts) -> list[int]:
+    counts = [int(c) for c in counts]
+    if len(into) < len(counts):
+        into.extend([0] * (len(counts) - len(into)))
+    for index, count in enumerate(counts):
+        into[index] += count
+    return into
+
+
+# ----------------------------
+# 純 Python：逐一呼叫 Bot 的 apply_action
+# ----------------------------
+
+
+def choose_action(state: PlayerState, policy: Policy, rules: RpgRules = RULES) -> str:
+    danger = state.hp <= rules.monster_damage.max(state.level)
+    if state.enemy is not None:
+        if danger and state.potions > 0 and state.hp < state.max_hp:
+            return "potion"
+        if danger and state.potions == 0 and policy.flee:
+            return "flee"
+        return "fight"
+    if state.hp < policy.rest_below * state.max_hp:
+        return "rest"
+    if state.gold >= rules.potion_price and state.potions < policy.keep_potions:
+        return "shop"
+    return "explore"
+
+
+def simulate_python(players: int, actions: int, policy: Policy, seed: int, rules: RpgRules = RULES) -> Report:
+    rng = random.Random(seed)
+    report = Report(players, actions)
+    marks = set(checkpoints(actions))
+    deaths = [0] * players
+    states = [new_player(rules) for _ in range(players)]
+    started = time.perf_counter()
+    for step in range(1, actions + 1):
+        for index, state in enumerate(states):
+            action = choose_action(state, policy, rules)
+            gold = state.gold
+            message = apply_action(state, action, rng, rules)
+            delta = state.gold - gold
+            report.action_counts[action] += 1
+            if action == "shop":
+                report.flows["spent"] -= delta
+            elif action == "flee":
+                report.flows["flee"] -= delta
+            elif action == "fight" and "你倒下了" in message:
+                deaths[index] += 1
+                report.flows["death"] -= delta
+            elif delta > 0:
+                report.flows["earned"] += delta
+        if step in marks:
+            hist = [0] * (max(s.level for s in states) + 1)
+            for state in states:
+                hist[state.level] += 1
+            report.level_hists[step] = hist
+    report.seconds = time.perf_counter() - started
+    report.death_hist = _merge_hist([], [deaths.count(n) for n in range(max(deaths) + 1)])
+    report.final_gold = sorted(s.gold for s in states)
+    return report
+
+
+# ----------------------------
+# NumPy：整批玩家一起走一步
+# ----------------------------
+
+
+def _simulate_chunk(n: int, actions: int, policy: Policy, seed, rules: RpgRules) -> tuple:
+    """回傳（這塊的 Report, 最終金幣陣列）。"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    report = Report(n, actions)
+    marks = set(checkpoints(actions))
+
+    def roll(spec: Roll, level, u):
+        span = spec.high - spec.low + 1 + spec.high_per_level * level
+        # float32 的 u * span 可能四捨五入剛好等於 span，要夾回 span - 1
+        value = spec.low + np.minimum((u * span).astype(np.int32), span - 1) + spec.per_level * level
+        if spec.level_div:
+            value += level // spec.level_div
+        return value
+
+    def bonus_max(spec: Roll, level):
+        value = spec.high + (spec.high_per_level + spec.per_level) * level
+        if spec.level_div:
+            value += level // spec.level_div
+        return value
+
+    t_monster = rules.explore_monster
+    t_chest = t_monster + rules.explore_chest
+    t_campfire = t_chest + rules.explore_campfire
+    i32 = np.int32
+    level = np.ones(n, i32)
+    xp = np.zeros(n, i32)
+    gold = np.zeros(n, i32)
+    max_hp = np.full(n, rules.start_hp, i32)
+    hp = max_hp.copy()
+    potions = np.full(n, rules.start_potions, i32)
+    enemy = np.zeros(n, i32)  # 怪物剩餘 HP；0 表示沒有遭遇戰
+    deaths = np.zeros(n, i32)
+    counts = dict.fromkeys(ACTIONS, 0)
+    flows = dict.fromkeys(("earned", "spent", "death", "flee"), 0)
+
+    for step in range(1, actions + 1):
+        u = rng.random((3, n), dtype=np.float32)
+        u1, u2, u3 = u[0], u[1], u[2]
+
+        # 策略（與 choose_action 相同）
+        in_fight = enemy > 0
+        danger = hp <= bonus_max(rules.monster_damage, level)
+        m_potion = in_fight & danger & (potions > 0) & (hp < max_hp)
+        m_flee = in_fight & danger & (potions == 0) & policy.flee
+        m_fight = in_fight & ~m_potion & ~m_flee
+        idle = ~in_fight
+        m_rest = idle & (hp < policy.rest_below * max_hp)
+        m_shop = idle & ~m_rest & (gold >= rules.potion_price) & (potions < policy.keep_potions)
+        m_explore = idle & ~m_rest & ~m_shop
+
+        # potion / rest / shop
+        hp += np.where(m_potion, np.minimum(rules.potion_heal, max_hp - hp), 0)
+        potions -= m_potion
+        hp += np.where(m_rest, np.minimum(roll(rules.rest_heal, level, u1), max_hp - hp), 0)
+        gold -= m_shop * rules.potion_price
+        potions += m_shop
+
+        # explore
+        m_monster = m_explore & (u1 < t_monster)
+        m_chest = m_explore & (u1 >= t_monster) & (u1 < t_chest)
+        m_campfire = m_explore & (u1 >= t_chest) & (u1 < t_campfire)
+        m_lost = m_explore & (u1 >= t_campfire)
+        enemy = np.where(m_monster, roll(rules.monster_hp, level, u2), enemy)
+        chest_gold = roll(rules.chest_gold, level, u2) * m_chest
+        gold += chest_gold + m_lost * rules.lost_gold
+        xp += roll(rules.chest_xp, level, u3) * m_chest
+        hp += np.where(m_campfire, np.minimum(roll(rules.campfire_heal, level, u2), max_hp - hp), 0)
+
+        # fight
+        enemy -= roll(rules.player_damage, level, u1) * m_fight
+        m_kill = m_fight & (enemy <= 0)
+        kill_gold = roll(rules.kill_gold, level, u2) * m_kill
+        gold += kill_gold
+        xp += roll(rules.kill_xp, level, u3) * m_kill
+        enemy[m_kill] = 0
+        m_hit = m_fight & ~m_kill
+        hp -= roll(rules.monster_damage, level, u2) * m_hit
+        m_dead = m_hit & (hp <= 0)
+        death_loss = (gold // rules.death_gold_divisor) * m_dead
+        gold -= death_loss
+        hp = np.where(m_dead, max_hp, hp)
+        enemy[m_dead] = 0
+        deaths += m_dead
+
+        # flee
+        flee_loss = np.minimum(gold, roll(rules.flee_penalty, level, u1)) * m_flee
+        gold -= flee_loss
+        enemy[m_flee] = 0
+
+        # 升級（一次可能升不只一級）
+        while True:
+            need = rules.xp_to_next.min(1) + (level - 1) * rules.xp_to_next.per_level
+            m_up = xp >= need
+            if not m_up.any():
+                break
+            xp -= need * m_up
+            level += m_up
+            max_hp += m_up * rules.level_up_max_hp
+            hp = np.where(m_up, max_hp, hp)
+            potions += m_up * rules.level_up_potions
+
+        flows["earned"] += int(chest_gold.sum() + kill_gold.sum()) + int(m_lost.sum()) * rules.lost_gold
+        flows["spent"] += int(m_shop.sum()) * rules.potion_price
+        flows["death"] += int(death_loss.sum())
+        flows["flee"] += int(flee_loss.sum())
+        for name, mask in (
+            ("explore", m_explore), ("fight", m_fight), ("flee", m_flee),
+            ("rest", m_rest), ("potion", m_potion), ("shop", m_shop),
+        ):
+            counts[name] += int(np.count_nonzero(mask))
+        if step in marks:
+            report.level_hists[step] = np.bincount(level).tolist()
+
+    report.death_hist = np.bincount(deaths).tolist()
+    report.action_counts = counts
+    report.flows = flows
+    return report, gold
+
+
+def simulate_numpy(
+    players: int,
+    actions: int,
+    policy: Policy,
+    seed: int,
+    rules: RpgRules = RULES,
+    chunk: int = 1 << 16,
+    jobs: int = 1,
+) -> Report:
+    """
+    玩家切成每塊 chunk 人（放得進 CPU 快取），每塊用各自的亂數種子，
+    所以 jobs 多開幾個行程結果也完全一樣。
+    """
+    import numpy as np
+
+    sizes = [min(chunk, players - offset) for offset in range(0, players, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(n, actions, policy, s, rules) for n, s in zip(sizes, seeds)]
+    report = Report(players, actions)
+    final_gold = []
+    started = time.perf_counter()
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs) as executor:
+            parts = list(executor.map(_simulate_chunk, *zip(*args)))
+    else:
+        parts = [_simulate_chunk(*a) for a in args]
+    for part, gold in parts:
+        for step, hist in part.level_hists.items():
+            _merge_hist(report.level_hists.setdefault(step, []), hist)
+        _merge_hist(report.death_hist, part.death_hist)
+        for name, value in part.action_counts.items():
+            report.action_counts[name] += value
+        for name, value in part.flows.items():
+            report.flows[name] += value
+        final_gold.append(gold)
+    report.seconds = time.perf_counter() - started
+    report.final_gold = np.sort(np.concatenate(final_gold)).tolist()
+    return report
+
+
+# ----------------------------
+# 報告
+# ----------------------------
+
+
+def _hist_percentile(hist: list[int], q: float) -> int:
+    target = q * (sum(hist) - 1)
+    running = 0
+    for value, count in enumerate(hist):
+        running += count
+        if running > target:
+            return value
+    return len(hist) - 1
+
+
+def _hist_mean(hist: list[int]) -> float:
+    return sum(value * count for value, count in enumerate(hist)) / max(1, sum(hist))
+
+
+def print_report(report: Report):
+    total_actions = report.players * report.actions
+    rate = total_actions / report.seconds if report.seconds else float("inf")
+    print(f"{report.players} 名玩家 × {report.actions} 步，耗時 {report.seconds:.2f} 秒（{rate / 1e6:.1f}M 步/秒）")
+
+    print("\n等級曲線")
+    print(f"{'步數':>8}{'平均':>8}{'p10':>6}{'p50':>6}{'p90':>6}{'最高':>6}")
+    for step, hist in sorted(report.level_hists.items()):
+        print(
+            f"{step:>8}{_hist_mean(hist):>8.2f}{_hist_percentile(hist, 0.1):>6}"
+            f"{_hist_percentile(hist, 0.5):>6}{_hist_percentile(hist, 0.9):>6}{len(hist) - 1:>6}"
+        )
+
+    deaths = report.death_hist
+    died = report.players - (deaths[0] if deaths else 0)
+    total_deaths = sum(n * count for n, count in enumerate(deaths))
+    print("\n死亡")
+    print(f"  至少倒下一次：{died / report.players:.1%}｜平均每人 {total_deaths / report.players:.2f} 次"
+          f"｜每千步 {total_deaths * 1000 / total_actions:.2f} 次｜p90 {_hist_percentile(deaths, 0.9)} 次")
+
+    gold = report.final_gold
+    pick = lambda q: gold[int(q * (len(gold) - 1))]  # noqa: E731
+    print("\n金幣")
+    print(f"  最終持有：平均 {sum(gold) / len(gold):.1f}｜p10 {pick(0.1)}｜p50 {pick(0.5)}｜p90 {pick(0.9)}｜p99 {pick(0.99)}")
+    flows = report.flows
+    print(
+        f"  每人平均：賺得 {flows['earned'] / report.players:.1f}｜買藥 {flows['spent'] / report.players:.1f}"
+        f"｜倒下損失 {flows['death'] / report.players:.1f}｜逃跑損失 {flows['flee'] / report.players:.1f}"
+    )
+
+    print("\n行動比例")
+    print("  " + "｜".join(f"{name} {count / total_actions:.1%}" for name, count in report.action_counts.items()))
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="RPG 平衡模擬器")
+    parser.add_argument("--players", type=int, default=100_000)
+    parser.add_argument("--actions", type=int, default=1000)
+    parser.add_argument("--engine", choices=["numpy", "python"], default="numpy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="NumPy 引擎同時使用的行程數")
+    parser.add_argument("--rest-below", type=float, default=0.5, help="血量低於最大值的這個比例就休息")
+    parser.add_argument("--keep-potions", type=int, default=2, help="藥水少於這個數量就去買")
+    parser.add_argument("--no-flee", action="store_true", help="沒藥也不逃跑")
+    args = parser.parse_args(argv)
+
+    policy = Policy(rest_below=args.rest_below, keep_potions=args.keep_potions, flee=not args.no_flee)
+    if args.engine == "numpy":
+        try:
+            report = simulate_numpy(args.players, args.actions, policy, args.seed, jobs=args.jobs)
+        except ImportError:
+            parser.error("NumPy 引擎需要 numpy：pip install numpy，或改用 --engine python")
+    else:
+        report = simulate_python(args.players, args.actions, policy, args.seed)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
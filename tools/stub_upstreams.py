@@ -0,0 +1,161 @@
+"""
+Tenor、cataas 與 YouTube feed 的本機替身，用來在不連外的情況下量測指令與輪詢。
+
+    python tools/stub_upstreams.py --port 8686 --latency 0.05 --failure-rate 0.02
+
+路徑前面加上原本的主機名稱：
+- GET  /tenor.googleapis.com/v2/search?q=...：10 筆 Tenor 結果
+- HEAD /cataas.com/cat/gif：302 轉址到 /cataas.com/cat/<id>
+- GET  /www.youtube.com/feeds/videos.xml?channel_id=...：15 部影片的 Atom feed（支援 ETag / 304）
+
+Bot 的程式碼仍然打原本的網址，由 StubHttpClient 在送出前改寫到這裡；
+回應延遲與失敗率（503）可以調整，feed 每次被抓取時有 change_rate 的機率多一部新片。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Any
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+from yarl import URL
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.http_client import HttpClient  # noqa: E402
+
+FEED_ENTRIES = 15
+UPLOAD_INTERVAL = 6 * 3600  # 替身頻道的上片間隔（秒），讓排程推估出穩定的頻率
+
+
+class StubUpstreams:
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, change_rate: float = 0.0, seed: int = 1):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.change_rate = change_rate
+        self.rng = random.Random(seed)
+        self.versions: dict[str, int] = {}  # YouTube 頻道 -> 最新一部影片的編號
+        self.requests = 0
+        self._runner: web.AppRunner | None = None
+        self.port = 0
+
+    async def _delay(self) -> bool:
+        """模擬延遲（0.5 ~ 1.5 倍），回傳這次是否要失敗。"""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * self.rng.uniform(0.5, 1.5))
+        return self.rng.random() < self.failure_rate
+
+    async def handle_tenor(self, request: web.Request) -> web.Response:
+        if await self._delay():
+            return web.Response(status=503)
+        query = request.query.get("q", "")
+        results = [
+            {"media_formats": {"gif": {"url": f"https://media.tenor.com/{zlib.crc32(query.encode()):08x}-{i}.gif"}}}
+            for i in range(10)
+        ]
+        return web.json_response({"results": results})
+
+    async def handle_cat(self, request: web.Request) -> web.Response:
+        if await self._delay():
+            return web.Response(status=503)
+        raise web.HTTPFound(f"/cataas.com/cat/{self.rng.getrandbits(48):012x}")
+
+    def _feed(self, channel_id: str, version: int) -> str:
+        entries = []
+        for number in range(version, max(0, version - FEED_ENTRIES), -1):
+            published = datetime.fromtimestamp(1_700_000_000 + number * UPLOAD_INTERVAL, timezone.utc).isoformat()
+            entries.append(
+                f"<entry><yt:videoId>{escape(channel_id)}-{number}</yt:videoId>"
+                f"<yt:channelId>{escape(channel_id)}</yt:channelId>"
+                f"<title>影片 {number}</title><published>{published}</published></entry>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">'
+            f"<title>{escape(channel_id)}</title>{''.join(entries)}</feed>"
+        )
+
+    async def handle_feed(self, request: web.Request) -> web.Response:
+        if await self._delay():
+            return web.Response(status=503)
+        channel_id = request.query.get("channel_id", "")
+        version = self.versions.get(channel_id, FEED_ENTRIES)
+        if self.rng.random() < self.change_rate:
+            version += 1
+        self.versions[channel_id] = version
+        etag = f'"{version}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=self._feed(channel_id, version), content_type="application/atom+xml", headers={"ETag": etag}
+        )
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/tenor.googleapis.com/v2/search", self.handle_tenor)
+        app.router.add_route("*", "/cataas.com/cat/gif", self.handle_cat)
+        app.router.add_get("/www.youtube.com/feeds/videos.xml", self.handle_feed)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> URL:
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.port = self._runner.addresses[0][1]
+        return URL.build(scheme="http", host=host, port=self.port)
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class StubHttpClient(HttpClient):
+    """把對外網址改寫成 base/<原主機>/<原路徑>，其餘（連線池、重試、斷路器）照常。"""
+
+    def __init__(self, base: URL, **kwargs):
+        super().__init__(**kwargs)
+        self.base = base
+
+    async def _send(self, method: str, url: str, kwargs: dict[str, Any]):
+        original = URL(url)
+        if original.host not in (None, self.base.host):
+            url = str(self.base.with_path(f"/{original.host}{original.path}").with_query(original.query))
+        return await super()._send(method, url, kwargs)
+
+
+async def serve(args: argparse.Namespace):
+    stub = StubUpstreams(args.latency, args.failure_rate, args.change_rate, args.seed)
+    base = await stub.start(args.host, args.port)
+    print(f"stub upstreams on {base}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stub.close()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Tenor / cataas / YouTube feed 本機替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8686)
+    parser.add_argument("--latency", type=float, default=0.0, help="平均回應延遲（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="回 503 的比例")
+    parser.add_argument("--change-rate", type=float, default=0.0, help="feed 每次被抓取時多一部新片的機率")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())